@@ -1,3 +1,29 @@
 from .player_object import playerObject
 from .utils import *
 from .secret_storage import SecretStore
+from .track_item import TrackItem
+from .paginated_list import PaginatedList
+from .play_queue import PlayQueue
+from .queue_model import PlayQueueModel
+from .metadata_cache import MetadataCache
+from .page_cache import PageCache
+from .search_cache import SearchCache
+from .favourites_index import FavouritesIndex
+from .offline_library import OfflineLibrary
+
+import importlib
+
+# Imported the first time they are used, the window doesn't need them to start
+_LAZY_MODULES = {
+    "DownloadManager": ".download_manager",
+    "StreamCache": ".stream_cache",
+}
+
+def __getattr__(name):
+    module_name = _LAZY_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    lazy_class = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = lazy_class
+    return lazy_class
@@ -0,0 +1,156 @@
+# disk_cache.py
+#
+# Copyright 2023 Nokse
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from collections import OrderedDict
+
+import json
+import os
+import tempfile
+import threading
+
+def write_atomically(path, data):
+    """Writes data to path through a temporary file in the same folder, so that
+    after a crash the file is either the old one or the new one"""
+
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+class DiskCache():
+    """Base of the on-disk caches, each entry is a file in cache_dir named after its key.
+    The size of each file is kept in least recently used order, when the total goes over
+    max_size the least recently used files are deleted. The order is saved in an index
+    on shutdown and read back on the next start"""
+
+    NAME = "disk cache" # Used in the error messages
+    EXTENSION = "" # Of the files of the entries
+
+    def __init__(self, cache_dir, max_size):
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+        self.max_size = max_size
+
+        self.entries = OrderedDict() # key -> size in bytes, least recently used first
+        self.total_size = 0
+
+        self.lock = threading.Lock()
+
+    def load_index(self):
+        """Reads the index saved on the last shutdown, then checks it against the files
+        actually in the cache folder, so that a crash doesn't leave untracked files behind"""
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        saved_order = []
+        try:
+            with open(self.index_path, "r") as file:
+                saved_order = json.load(file)
+        except (OSError, ValueError):
+            pass
+
+        files = {}
+        with os.scandir(self.cache_dir) as iterator:
+            for entry in iterator:
+                if not entry.is_file():
+                    continue
+                if entry.name.endswith(self.EXTENSION):
+                    stat = entry.stat()
+                    files[entry.name[:-len(self.EXTENSION)]] = (stat.st_size, stat.st_mtime)
+                else:
+                    self._on_other_file(entry)
+
+        with self.lock:
+            self.entries.clear()
+            self.total_size = 0
+
+            # Files not in the index are considered older than the indexed ones
+            saved_keys = set(saved_order)
+            untracked = sorted((key for key in files if key not in saved_keys), key=lambda key: files[key][1])
+            for key in untracked + [key for key in saved_order if key in files]:
+                self.entries[key] = files[key][0]
+                self.total_size += files[key][0]
+
+            self._evict()
+
+    def _on_other_file(self, entry):
+        """Overwritten to clean up the files in the cache folder that are not entries"""
+
+        return
+
+    def save_index(self):
+        with self.lock:
+            data = json.dumps(list(self.entries.keys()))
+
+        try:
+            write_atomically(self.index_path, data.encode())
+        except OSError as e:
+            print(f"failed to save the {self.NAME} index: {e}")
+
+    def set_max_size(self, max_size):
+        with self.lock:
+            self.max_size = max_size
+            self._evict()
+
+    def get_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}{self.EXTENSION}")
+
+    def lookup(self, key):
+        """Returns the path of the file of key and marks it as the most recently used,
+        or None if it's not cached"""
+
+        path = self.get_path(key)
+
+        with self.lock:
+            if key not in self.entries:
+                return None
+            if not os.path.isfile(path):
+                self.total_size -= self.entries.pop(key)
+                return None
+            self.entries.move_to_end(key)
+
+        return path
+
+    def add_entry(self, key, size):
+        """Records the file of key, already written to its path, then deletes the least
+        recently used files if the cache is too big"""
+
+        with self.lock:
+            if key in self.entries:
+                self.total_size -= self.entries.pop(key)
+            self.entries[key] = size
+            self.total_size += size
+            self._evict(keep=key)
+
+    def _evict(self, keep=None):
+        while self.total_size > self.max_size and self.entries:
+            key = next(iter(self.entries))
+            if key == keep:
+                break
+            self.total_size -= self.entries.pop(key)
+            try:
+                os.remove(self.get_path(key))
+            except OSError:
+                pass
@@ -0,0 +1,280 @@
+# download_manager.py
+#
+# Copyright 2023 Nokse
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from gi.repository import GObject
+from gi.repository import GLib
+
+from tidalapi.mix import Mix
+from tidalapi.media import Track
+
+import os
+import queue
+import threading
+import time
+
+from . import utils
+
+class _Download():
+    def __init__(self, track, quality):
+        self.track = track
+        self.quality = quality
+        self.cancelled = False
+        self.last_report_time = 0
+
+class DownloadManager(GObject.GObject):
+    """Downloads tracks to the offline library with a fixed number of parallel transfers.
+
+    Tracks are streamed to a .part file one chunk at a time, so memory use doesn't depend
+    on the file size, and a transfer that fails or is cancelled is resumed from where it
+    stopped with an HTTP Range request. A file is moved into the library only when its
+    size matches the one announced by the server"""
+
+    __gsignals__ = {
+        # Track id, bytes downloaded and total bytes, -1 when the total is not known yet
+        'download-progress': (GObject.SignalFlags.RUN_FIRST, None, (str, GObject.TYPE_INT64, GObject.TYPE_INT64)),
+        # Track id and path of the downloaded file
+        'download-finished': (GObject.SignalFlags.RUN_FIRST, None, (str, str)),
+        # Track id and error message
+        'download-failed': (GObject.SignalFlags.RUN_FIRST, None, (str, str)),
+    }
+
+    EXTENSIONS = {
+        "audio/flac": "flac",
+        "audio/x-flac": "flac",
+        "audio/mp4": "m4a",
+        "audio/x-m4a": "m4a",
+        "audio/mpeg": "mp3",
+    }
+
+    def __init__(self, session, library, n_workers=3, chunk_size=256 * 1024, retries=3):
+        GObject.GObject.__init__(self)
+
+        self.session = session
+        self.library = library
+        self.chunk_size = chunk_size
+        self.retries = retries
+
+        self.downloads = {} # track id -> _Download, for queued and running downloads
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+
+        self.completed = 0
+        self.failed = 0
+        self.downloaded_bytes = 0
+
+        for index in range(n_workers):
+            th = threading.Thread(target=self._worker, name=f"download-manager-{index}")
+            th.daemon = True
+            th.start()
+
+    def download(self, track):
+        """Queues the track in the current quality, returns False if it's
+        already downloaded or queued"""
+
+        quality = self.session.audio_quality
+
+        with self.lock:
+            if str(track.id) in self.downloads or self.library.contains(track.id, quality):
+                return False
+            download = _Download(track, quality)
+            self.downloads[str(track.id)] = download
+
+        self.queue.put(download)
+        return True
+
+    def download_tracks(self, tracks):
+        for track in tracks:
+            self.download(track)
+
+    def download_collection(self, item):
+        """Queues all the tracks of an album, playlist or mix, they are listed on a worker thread"""
+
+        utils.task_runner.run(self._get_all_tracks, item, callback=self.download_tracks,
+                error_callback=lambda e: print(f"failed to list the tracks to download: {e}"))
+
+    def cancel(self, track_id):
+        """Stops the download of the track, the partial file is kept to resume it later"""
+
+        with self.lock:
+            download = self.downloads.pop(str(track_id), None)
+        if download:
+            download.cancelled = True
+
+    def cancel_all(self):
+        with self.lock:
+            downloads = list(self.downloads.values())
+            self.downloads.clear()
+        for download in downloads:
+            download.cancelled = True
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "pending": len(self.downloads),
+                "completed": self.completed,
+                "failed": self.failed,
+                "downloaded-bytes": self.downloaded_bytes
+            }
+
+    def _get_all_tracks(self, item, page_size=100):
+        if isinstance(item, Mix):
+            return [track for track in item.items() if isinstance(track, Track)]
+
+        tracks = []
+        offset = 0
+        while True:
+            page = item.tracks(limit=page_size, offset=offset)
+            tracks.extend(track for track in page if isinstance(track, Track))
+            offset += len(page)
+            if len(page) < page_size:
+                return tracks
+
+    def _worker(self):
+        while True:
+            download = self.queue.get()
+            if download.cancelled:
+                continue
+
+            try:
+                path = self._transfer(download)
+            except Exception as e:
+                if download.cancelled:
+                    continue
+                print(f"failed to download {download.track.id}: {e}")
+                GLib.idle_add(self._on_failed, download, str(e))
+                continue
+
+            if path:
+                GLib.idle_add(self._on_finished, download, path)
+
+    def _transfer(self, download):
+        """Downloads the track, retrying and resuming after errors, and returns
+        the path in the library or None if it was cancelled"""
+
+        if self.session.audio_quality != download.quality:
+            # The stream url is always for the current quality
+            raise ValueError("the quality changed after queueing the track")
+
+        partial_path = self.library.get_partial_path(download.track.id, download.quality)
+        os.makedirs(os.path.dirname(partial_path), exist_ok=True)
+
+        for attempt in range(self.retries + 1):
+            try:
+                # Stream urls expire, a new one is requested for every attempt
+                url = download.track.get_url()
+                result = self._download_range(download, url, partial_path)
+                break
+            except Exception:
+                if attempt == self.retries or download.cancelled:
+                    raise
+                time.sleep(2 ** attempt)
+
+        if result is None:
+            return None
+
+        content_type, total = result
+        size = os.path.getsize(partial_path)
+
+        extension = self.EXTENSIONS.get(content_type, "flac")
+        path = self.library.get_track_path(download.track, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(partial_path, path)
+
+        self.library.add(download.track, path, download.quality, size)
+        return path
+
+    def _download_range(self, download, url, partial_path):
+        """Appends the missing part of the file to partial_path, returns the content type
+        and the total size or None if cancelled. Raises if the file is incomplete"""
+
+        try:
+            offset = os.path.getsize(partial_path)
+        except OSError:
+            offset = 0
+
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        with utils.http_client.get(url, headers=headers, stream=True) as response:
+            content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+
+            if response.status_code == 416:
+                # Nothing left to download, unless the file on the server changed
+                total = self._get_range_total(response)
+                if total == offset:
+                    return content_type, total
+                os.remove(partial_path)
+                raise IOError("the partial file doesn't match the one on the server")
+
+            response.raise_for_status()
+
+            if response.status_code == 206:
+                total = self._get_range_total(response)
+                mode = "ab"
+            else:
+                # The server ignored the range, the file is downloaded again from the start
+                total = int(response.headers.get("Content-Length", 0)) or None
+                offset = 0
+                mode = "wb"
+
+            downloaded = offset
+            with open(partial_path, mode) as file:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if download.cancelled:
+                        return None
+                    file.write(chunk)
+                    downloaded += len(chunk)
+                    with self.lock:
+                        self.downloaded_bytes += len(chunk)
+                    self._report_progress(download, downloaded, total)
+
+        if total is not None and downloaded != total:
+            if downloaded > total:
+                os.remove(partial_path)
+            raise IOError(f"downloaded {downloaded} bytes of {total}")
+
+        self._report_progress(download, downloaded, total, force=True)
+        return content_type, total
+
+    def _get_range_total(self, response):
+        # Content-Range is "bytes start-end/total" or "bytes */total"
+        total = response.headers.get("Content-Range", "").rpartition("/")[2]
+        return int(total) if total.isdigit() else None
+
+    def _report_progress(self, download, downloaded, total, force=False):
+        now = time.monotonic()
+        if not force and now - download.last_report_time < 0.25:
+            return
+        download.last_report_time = now
+        GLib.idle_add(self.emit, "download-progress", str(download.track.id), downloaded, total if total is not None else -1)
+
+    def _on_finished(self, download, path):
+        with self.lock:
+            if self.downloads.get(str(download.track.id)) is download:
+                del self.downloads[str(download.track.id)]
+            self.completed += 1
+
+        self.emit("download-finished", str(download.track.id), path)
+
+    def _on_failed(self, download, message):
+        with self.lock:
+            if self.downloads.get(str(download.track.id)) is download:
+                del self.downloads[str(download.track.id)]
+            self.failed += 1
+
+        self.emit("download-failed", str(download.track.id), message)
@@ -0,0 +1,194 @@
+# favourites_index.py
+#
+# Copyright 2023 Nokse
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from gi.repository import GObject
+
+import tidalapi
+from tidalapi.mix import Mix
+from tidalapi.artist import Artist
+from tidalapi.album import Album
+from tidalapi.media import Track
+from tidalapi.playlist import Playlist
+
+from . import utils
+
+class FavouritesIndex(GObject.GObject):
+    """Sets of the ids of the user favourite tracks, albums, artists, playlists and mixes,
+    so any heart button can check if an item is a favourite in O(1).
+
+    All the favourites are loaded in the background a page at a time, adding or removing
+    a favourite updates the sets right away and then the service. changed is emitted
+    every time the sets change"""
+
+    __gsignals__ = {
+        'changed': (GObject.SignalFlags.RUN_FIRST, None, ()),
+    }
+
+    KINDS = {
+        Track: "track",
+        Album: "album",
+        Artist: "artist",
+        Playlist: "playlist",
+        Mix: "mix"
+    }
+
+    # Name of the Favorites method listing each kind, mixes can't be listed with tidalapi 0.7.3
+    FETCH_FUNCTIONS = {
+        "track": "tracks",
+        "album": "albums",
+        "artist": "artists",
+        "playlist": "playlists"
+    }
+
+    PAGE_SIZE = 100
+
+    def __init__(self, session):
+        GObject.GObject.__init__(self)
+
+        self.session = session
+
+        self.ids = {kind: set() for kind in self.KINDS.values()}
+        self.isrcs = set() # The same track can have more than one id
+        self.generation = 0 # Loads started before the last clear are ignored
+        self.loading = set() # Kinds being loaded
+        self.pending = {} # kind -> {id: (item, added)}, changes made while loading that kind
+
+    def load(self):
+        """Loads all the favourites in the background, replacing the current ones"""
+
+        self.clear()
+
+        for kind in self.FETCH_FUNCTIONS:
+            self.loading.add(kind)
+            utils.task_runner.run(self._load_kind, kind, self.generation,
+                    callback=self._on_kind_loaded,
+                    error_callback=lambda e, kind=kind, generation=self.generation: self._on_kind_failed(kind, generation, e))
+
+    def clear(self):
+        self.generation += 1
+        self.loading.clear()
+        self.pending.clear()
+        for ids in self.ids.values():
+            ids.clear()
+        self.isrcs.clear()
+        self.emit("changed")
+
+    def contains(self, item):
+        kind = self.get_kind(item)
+        if kind is None:
+            return False
+        if kind == "track" and getattr(item, "isrc", None) in self.isrcs:
+            return True
+        return item.id in self.ids[kind]
+
+    def add(self, item):
+        """Adds item to the favourites, returns False if its type can't be added"""
+
+        kind = self.get_kind(item)
+        if kind is None or kind == "mix": # Adding mixes is not supported by tidalapi
+            return False
+
+        self._add_item(kind, item)
+        self._set_pending(kind, item, True)
+        self.emit("changed")
+
+        utils.task_runner.run(getattr(self.session.user.favorites, f"add_{kind}"), item.id,
+                error_callback=lambda e: self._on_update_failed(kind, item, True, e))
+        return True
+
+    def remove(self, item):
+        """Removes item from the favourites, returns False if its type can't be removed"""
+
+        kind = self.get_kind(item)
+        if kind is None or kind == "mix": # Removing mixes is not supported by tidalapi
+            return False
+
+        self._remove_item(kind, item)
+        self._set_pending(kind, item, False)
+        self.emit("changed")
+
+        utils.task_runner.run(getattr(self.session.user.favorites, f"remove_{kind}"), item.id,
+                error_callback=lambda e: self._on_update_failed(kind, item, False, e))
+        return True
+
+    def get_kind(self, item):
+        for item_type, kind in self.KINDS.items():
+            if isinstance(item, item_type):
+                return kind
+        return None
+
+    def _load_kind(self, kind, generation):
+        fetch_function = getattr(self.session.user.favorites, self.FETCH_FUNCTIONS[kind])
+
+        items = []
+        while True:
+            page = fetch_function(self.PAGE_SIZE, len(items))
+            items.extend(page)
+            if len(page) < self.PAGE_SIZE:
+                break
+
+        return kind, generation, items
+
+    def _on_kind_loaded(self, result):
+        kind, generation, items = result
+        if generation != self.generation:
+            return
+
+        for item in items:
+            self._add_item(kind, item)
+
+        # The items were listed before the changes made while loading, they are applied again
+        self.loading.discard(kind)
+        for item, added in self.pending.pop(kind, {}).values():
+            if added:
+                self._add_item(kind, item)
+            else:
+                self._remove_item(kind, item)
+
+        self.emit("changed")
+
+    def _on_kind_failed(self, kind, generation, error):
+        print(f"failed to load favourite {kind}s: {error}")
+        if generation == self.generation:
+            self.loading.discard(kind)
+            self.pending.pop(kind, None)
+
+    def _on_update_failed(self, kind, item, added, error):
+        print(f"failed to update favourite {kind} {item.id}: {error}")
+
+        if added:
+            self._remove_item(kind, item)
+        else:
+            self._add_item(kind, item)
+        self.pending.get(kind, {}).pop(item.id, None)
+        self.emit("changed")
+
+    def _set_pending(self, kind, item, added):
+        if kind in self.loading:
+            self.pending.setdefault(kind, {})[item.id] = (item, added)
+
+    def _add_item(self, kind, item):
+        self.ids[kind].add(item.id)
+        if kind == "track" and getattr(item, "isrc", None):
+            self.isrcs.add(item.isrc)
+
+    def _remove_item(self, kind, item):
+        self.ids[kind].discard(item.id)
+        if kind == "track" and getattr(item, "isrc", None):
+            self.isrcs.discard(item.isrc)
@@ -0,0 +1,93 @@
+# http_client.py
+#
+# Copyright 2023 Nokse
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import threading
+
+class HTTPClient():
+    """Shared HTTP session used by all the downloaders, it keeps the connections
+    to each host alive and retries failed requests with an increasing delay"""
+
+    def __init__(self, pool_size=8, timeout=(5, 30), retries=3, backoff_factor=0.5):
+        self.timeout = timeout # (connect, read) in seconds
+        self.retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"]))
+
+        # Counters of the pools already closed, the open ones are read directly
+        self.closed_connections_opened = 0
+        self.closed_requests = 0
+
+        self.lock = threading.Lock()
+
+        self.session = requests.Session()
+        self.adapter = None
+        self.set_pool_size(pool_size)
+
+    def set_pool_size(self, pool_size):
+        """Sets the maximum number of connections kept open for each host"""
+
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=pool_size, max_retries=self.retry)
+        adapter.poolmanager.pools.dispose_func = self._on_pool_disposed
+
+        with self.lock:
+            old_adapter = self.adapter
+            self.adapter = adapter
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+
+        if old_adapter:
+            old_adapter.close()
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def head(self, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.head(url, **kwargs)
+
+    def get_stats(self):
+        """Returns how many connections were opened and how many requests reused one"""
+
+        with self.lock:
+            opened = self.closed_connections_opened
+            requests_made = self.closed_requests
+            pools = self.adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+                    requests_made += pool.num_requests
+
+        return {
+            "connections-opened": opened,
+            "connections-reused": max(requests_made - opened, 0),
+            "requests": requests_made
+        }
+
+    def _on_pool_disposed(self, pool):
+        self.closed_connections_opened += pool.num_connections
+        self.closed_requests += pool.num_requests
+        pool.close()
@@ -0,0 +1,57 @@
+# image_cache.py
+#
+# Copyright 2023 Nokse
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from gi.repository import GLib
+
+import hashlib
+import os
+
+from .disk_cache import DiskCache, write_atomically
+
+class ImageCache(DiskCache):
+    """Persistent on-disk cache for the downloaded images, keyed by image url and resolution.
+    When the total size goes over max_size the least recently used images are deleted"""
+
+    NAME = "image cache"
+    EXTENSION = ".img"
+
+    def __init__(self, cache_dir=None, max_size=200 * 1024 * 1024):
+        if cache_dir is None:
+            cache_dir = os.path.join(GLib.get_user_cache_dir(), "high-tide", "images")
+
+        super().__init__(cache_dir, max_size)
+
+    def get_key(self, url, resolution=None):
+        return hashlib.sha1(f"{resolution}:{url}".encode()).hexdigest()
+
+    def get(self, url, resolution=None):
+        """Returns the path of the cached image or None if it is not cached"""
+
+        return self.lookup(self.get_key(url, resolution))
+
+    def put(self, url, data, resolution=None):
+        """Saves the image data in the cache and returns its path"""
+
+        key = self.get_key(url, resolution)
+        path = self.get_path(key)
+
+        write_atomically(path, data)
+        self.add_entry(key, len(data))
+
+        return path
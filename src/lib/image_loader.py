@@ -0,0 +1,183 @@
+# image_loader.py
+#
+# Copyright 2023 Nokse
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from gi.repository import GLib
+
+import itertools
+import queue
+import threading
+
+class _ImageJob():
+    def __init__(self, key, item, size, priority):
+        self.key = key
+        self.item = item
+        self.size = size
+        self.priority = priority
+        self.started = False
+        self.requests = [] # (widget, setter, cancellable, map handler id)
+
+class ImageLoader():
+    """Loads all the images with a fixed number of worker threads.
+
+    Requests for images of widgets that are visible are served first, identical requests
+    share the same download and the requests made with a Gio.Cancellable are dropped when
+    it's cancelled.
+    Images are decoded and scaled on the workers, the main thread only receives textures"""
+
+    HIGH_PRIORITY = 0
+    LOW_PRIORITY = 1
+
+    def __init__(self, fetch_function, texture_cache, n_workers=4):
+        self.fetch_function = fetch_function # (item, size) -> Gdk.Texture, called on the worker threads
+        self.texture_cache = texture_cache # shared by all the widgets showing the same image
+
+        self.jobs = {} # texture cache key -> _ImageJob, for queued and running jobs
+        self.widget_jobs = {} # id(widget) -> _ImageJob, the last image requested for each widget
+        self.queue = queue.PriorityQueue()
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+        for index in range(n_workers):
+            th = threading.Thread(target=self._worker, name=f"image-loader-{index}")
+            th.daemon = True
+            th.start()
+
+    def load(self, widget, item, setter, size, cancellable=None):
+        """Queues the image of item, scaled to size, to be passed to setter(widget, texture) on the main thread.
+        It must be called on the main thread"""
+
+        if cancellable and cancellable.is_cancelled():
+            return
+
+        try:
+            key = self.texture_cache.get_key(item, size)
+        except Exception as e:
+            print(str(e))
+            return
+
+        # A widget that is reused for another item, like a list row, drops its previous request
+        with self.lock:
+            self._drop_widget_request(widget)
+
+        # load is called on the main thread, a cached texture is set right away so that
+        # it can't arrive after the widget was reused for another item
+        texture = self.texture_cache.get(key)
+        if texture:
+            setter(widget, texture)
+            return
+
+        priority = self.HIGH_PRIORITY if widget.get_mapped() else self.LOW_PRIORITY
+
+        with self.lock:
+            job = self.jobs.get(key)
+            if job is None:
+                job = _ImageJob(key, item, size, priority)
+                self.jobs[key] = job
+                self.queue.put((priority, next(self.counter), job))
+            elif priority < job.priority and not job.started:
+                job.priority = priority
+                self.queue.put((priority, next(self.counter), job))
+
+            handler_id = None
+            if priority == self.LOW_PRIORITY:
+                handler_id = widget.connect("map", self._on_widget_mapped, job)
+            job.requests.append((widget, setter, cancellable, handler_id))
+            self.widget_jobs[id(widget)] = job
+
+    def cancel(self, cancellable):
+        """Drops all the requests made with cancellable, jobs with no requests left are not downloaded"""
+
+        with self.lock:
+            for key, job in list(self.jobs.items()):
+                remaining = []
+                for request in job.requests:
+                    if request[2] is cancellable:
+                        self._disconnect(request)
+                        self.widget_jobs.pop(id(request[0]), None)
+                    else:
+                        remaining.append(request)
+                job.requests = remaining
+                if not remaining and not job.started:
+                    del self.jobs[key]
+
+    def _on_widget_mapped(self, widget, job):
+        with self.lock:
+            if not job.started and job.priority != self.HIGH_PRIORITY:
+                job.priority = self.HIGH_PRIORITY
+                self.queue.put((self.HIGH_PRIORITY, next(self.counter), job))
+
+    def _worker(self):
+        while True:
+            priority, count, job = self.queue.get()
+
+            with self.lock:
+                # Skip jobs already taken from a higher priority entry or cancelled
+                if job.started or self.jobs.get(job.key) is not job:
+                    continue
+                job.started = True
+
+            try:
+                texture = self.fetch_function(job.item, job.size)
+            except Exception as e:
+                print(str(e))
+                texture = None
+
+            if texture:
+                self.texture_cache.put(job.key, texture)
+
+            with self.lock:
+                del self.jobs[job.key]
+
+            GLib.idle_add(self._deliver, job, texture)
+
+    def _deliver(self, job, texture):
+        with self.lock:
+            requests = job.requests
+            job.requests = []
+            for request in requests:
+                if self.widget_jobs.get(id(request[0])) is job:
+                    del self.widget_jobs[id(request[0])]
+
+        for request in requests:
+            self._disconnect(request)
+            if texture:
+                widget, setter, cancellable, handler_id = request
+                if cancellable and cancellable.is_cancelled():
+                    continue
+                setter(widget, texture)
+
+    def _drop_widget_request(self, widget):
+        job = self.widget_jobs.pop(id(widget), None)
+        if job is None:
+            return
+
+        remaining = []
+        for request in job.requests:
+            if request[0] is widget:
+                self._disconnect(request)
+            else:
+                remaining.append(request)
+        job.requests = remaining
+        if not remaining and not job.started and self.jobs.get(job.key) is job:
+            del self.jobs[job.key]
+
+    def _disconnect(self, request):
+        widget, setter, cancellable, handler_id = request
+        if handler_id is not None:
+            widget.disconnect(handler_id)
@@ -0,0 +1,286 @@
+# metadata_cache.py
+#
+# Copyright 2023 Nokse
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from gi.repository import GLib
+
+from collections import OrderedDict
+
+import io
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import types
+
+from . import utils
+
+class _Pickler(pickle.Pickler):
+    def __init__(self, file, shared_objects):
+        super().__init__(file)
+        self.shared_objects = shared_objects
+
+    def persistent_id(self, obj):
+        # The session and everything it shares with the objects it creates (requests,
+        # config...) are stored as a reference and replaced with the live ones when loading
+        if isinstance(obj, types.MethodType):
+            name = self.shared_objects.get(id(obj.__self__))
+            if name is not None:
+                return ("method", name, obj.__func__.__name__)
+            return None
+        name = self.shared_objects.get(id(obj))
+        if name is not None:
+            return ("object", name)
+        return None
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file, objects):
+        super().__init__(file)
+        self.objects = objects
+
+    def persistent_load(self, pid):
+        if pid[0] == "method":
+            return getattr(self.objects[pid[1]], pid[2])
+        return self.objects[pid[1]]
+
+class MetadataCache():
+    """Caches the responses of the service (albums, artists, their tracks...) keyed by
+    kind and id. Recent entries are kept in memory, all of them are stored in a SQLite
+    database so they survive restarts. Each kind has its own time to live, expired
+    entries are fetched again"""
+
+    MINUTE = 60
+    HOUR = 60 * MINUTE
+    DAY = 24 * HOUR
+
+    # Albums and tracks don't change, playlists and mixes can be edited or regenerated
+    TTLS = {
+        "track": 7 * DAY,
+        "album": 7 * DAY,
+        "album-tracks": 7 * DAY,
+        "artist": DAY,
+        "artist-top-tracks": DAY,
+        "artist-albums": DAY,
+        "artist-similar": DAY,
+        "artist-bio": 7 * DAY,
+        "playlist": HOUR,
+        "playlist-tracks": HOUR,
+        "mix": HOUR,
+        "mix-tracks": HOUR,
+        "home": 10 * MINUTE,
+        "explore": HOUR,
+    }
+    DEFAULT_TTL = HOUR
+
+    def __init__(self, session, db_path=None, max_memory_entries=500):
+        if db_path is None:
+            db_path = os.path.join(GLib.get_user_cache_dir(), "high-tide", "metadata.db")
+
+        self.session = session
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+
+        self.entries = OrderedDict() # (kind, key) -> (value, fetch time), least recently used first
+        self.db = None
+
+        self.hits = 0
+        self.misses = 0
+
+        self.lock = threading.Lock()
+
+    def get(self, kind, key, fetch_function):
+        """Returns the cached value of kind and key if it's not expired, otherwise
+        calls fetch_function(), caches and returns its result"""
+
+        entry = self.lookup(kind, key)
+        if entry and not self.is_expired(kind, entry[1]):
+            with self.lock:
+                self.hits += 1
+            return entry[0]
+
+        with self.lock:
+            self.misses += 1
+        value = fetch_function()
+        self.put(kind, key, value)
+        return value
+
+    def is_expired(self, kind, fetch_time):
+        return time.time() - fetch_time >= self.TTLS.get(kind, self.DEFAULT_TTL)
+
+    def lookup(self, kind, key):
+        """Returns (value, fetch time) of kind and key, even if expired, or None"""
+
+        key = str(key)
+
+        with self.lock:
+            entry = self.entries.get((kind, key))
+            if entry:
+                self.entries.move_to_end((kind, key))
+                return entry
+
+            row = None
+            db = self._get_db()
+            if db:
+                row = db.execute("SELECT value, time FROM entries WHERE kind = ? AND key = ?",
+                        (kind, key)).fetchone()
+
+        if row is None:
+            return None
+
+        try:
+            value = _Unpickler(io.BytesIO(row[0]), self._get_shared_objects()[1]).load()
+        except Exception as e:
+            print(f"failed to load cached {kind} {key}: {e}")
+            return None
+
+        with self.lock:
+            self._put_in_memory(kind, key, (value, row[1]))
+        return (value, row[1])
+
+    def put(self, kind, key, value):
+        key = str(key)
+        fetch_time = time.time()
+
+        try:
+            file = io.BytesIO()
+            _Pickler(file, self._get_shared_objects()[0]).dump(value)
+            data = file.getvalue()
+        except Exception as e:
+            print(f"failed to store {kind} {key} in the cache: {e}")
+            data = None
+
+        with self.lock:
+            self._put_in_memory(kind, key, (value, fetch_time))
+
+            db = self._get_db()
+            if db and data is not None:
+                db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                        (kind, key, data, fetch_time))
+                db.commit()
+
+    def get_stale_while_revalidate(self, kind, key, fetch_function, on_refreshed, cancellable=None):
+        """Returns the cached value of kind and key right away, even if expired. If it's
+        expired a fresh one is fetched in the background and passed to on_refreshed(value)
+        on the main thread. With nothing cached it fetches and returns the value"""
+
+        entry = self.lookup(kind, key)
+        if entry is None:
+            return self.get(kind, key, fetch_function)
+
+        if self.is_expired(kind, entry[1]):
+            utils.task_runner.run(self._revalidate, kind, key, fetch_function, callback=on_refreshed,
+                    error_callback=lambda e: print(f"failed to refresh {kind} {key}: {e}"),
+                    cancellable=cancellable)
+
+        return entry[0]
+
+    def _revalidate(self, kind, key, fetch_function):
+        value = fetch_function()
+        self.put(kind, key, value)
+        return value
+
+    def invalidate(self, kind, key):
+        key = str(key)
+
+        with self.lock:
+            self.entries.pop((kind, key), None)
+
+            db = self._get_db()
+            if db:
+                db.execute("DELETE FROM entries WHERE kind = ? AND key = ?", (kind, key))
+                db.commit()
+
+    def invalidate_prefix(self, kind, prefix):
+        """Removes the entries of kind with a key that starts with prefix,
+        like all the pages of the tracks of a playlist"""
+
+        prefix = str(prefix)
+
+        with self.lock:
+            for entry_kind, key in list(self.entries.keys()):
+                if entry_kind == kind and key.startswith(prefix):
+                    del self.entries[(entry_kind, key)]
+
+            db = self._get_db()
+            if db:
+                db.execute("DELETE FROM entries WHERE kind = ? AND substr(key, 1, ?) = ?",
+                        (kind, len(prefix), prefix))
+                db.commit()
+
+    def invalidate_playlist(self, playlist_id):
+        """Called after editing a playlist, its tracks are cached a page at a time"""
+
+        self.invalidate("playlist", playlist_id)
+        self.invalidate_prefix("playlist-tracks", f"{playlist_id}:")
+
+    def clear(self):
+        """Removes all the entries, used when the user logs out"""
+
+        with self.lock:
+            self.entries.clear()
+
+            db = self._get_db()
+            if db:
+                db.execute("DELETE FROM entries")
+                db.commit()
+
+    def close(self):
+        with self.lock:
+            if self.db:
+                self.db.close()
+                self.db = None
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries in memory": len(self.entries)
+            }
+
+    def _put_in_memory(self, kind, key, entry):
+        self.entries[(kind, key)] = entry
+        self.entries.move_to_end((kind, key))
+        while len(self.entries) > self.max_memory_entries:
+            self.entries.popitem(last=False)
+
+    def _get_db(self):
+        # Opened on first use, the pages use the cache from their loading threads
+        if self.db is None:
+            try:
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+                self.db = sqlite3.connect(self.db_path, check_same_thread=False)
+                self.db.execute("""CREATE TABLE IF NOT EXISTS entries (
+                        kind TEXT, key TEXT, value BLOB, time REAL, PRIMARY KEY (kind, key))""")
+                self.db.commit()
+            except sqlite3.Error as e:
+                print(f"metadata cache database not available: {e}")
+                self.db = False
+        return self.db
+
+    def _get_shared_objects(self):
+        """Returns the ids and the names of the objects that are not stored,
+        the session and its attributes"""
+
+        objects = {"session": self.session}
+        for name, value in vars(self.session).items():
+            if not isinstance(value, (str, bytes, int, float, bool, list, dict, tuple, type(None))):
+                objects[name] = value
+
+        return {id(value): name for name, value in objects.items()}, objects
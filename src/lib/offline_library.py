@@ -0,0 +1,141 @@
+# offline_library.py
+#
+# Copyright 2023 Nokse
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from gi.repository import GLib
+
+import json
+import os
+import re
+import threading
+
+from .disk_cache import write_atomically
+
+class OfflineLibrary():
+    """Index of the downloaded tracks, saved as json next to the other application data.
+
+    The files are stored in library_dir as Artist/Album/D-NN - Title.ext, the index maps
+    each track id to its file, the quality it was downloaded in and its size, so that
+    a file that was moved or only partially written is never used"""
+
+    def __init__(self, library_dir=None, index_path=None):
+        if not library_dir:
+            music_dir = GLib.get_user_special_dir(GLib.UserDirectory.DIRECTORY_MUSIC)
+            if music_dir is None:
+                music_dir = os.path.join(GLib.get_home_dir(), "Music")
+            library_dir = os.path.join(music_dir, "High Tide")
+        if index_path is None:
+            index_path = os.path.join(GLib.get_user_data_dir(), "high-tide", "offline.json")
+
+        self.library_dir = library_dir
+        self.partial_dir = os.path.join(library_dir, ".partial")
+        self.index_path = index_path
+
+        self.entries = {} # track id -> {"path", "quality", "size"}
+
+        self.lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.index_path, "r") as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            entries = {}
+
+        with self.lock:
+            self.entries = entries
+
+    def save(self):
+        with self.lock:
+            data = json.dumps(self.entries)
+
+        try:
+            write_atomically(self.index_path, data.encode())
+        except OSError as e:
+            print(f"failed to save the offline library index: {e}")
+
+    def get(self, track_id, quality=None):
+        """Returns the path of the downloaded track or None if it's not downloaded,
+        with a quality only a file downloaded in that quality is returned"""
+
+        with self.lock:
+            entry = self.entries.get(str(track_id))
+
+        if entry is None or (quality is not None and entry["quality"] != self.get_quality_name(quality)):
+            return None
+
+        try:
+            if os.path.getsize(entry["path"]) != entry["size"]:
+                return None
+        except OSError:
+            return None
+
+        return entry["path"]
+
+    def contains(self, track_id, quality=None):
+        return self.get(track_id, quality) is not None
+
+    def add(self, track, path, quality, size):
+        with self.lock:
+            self.entries[str(track.id)] = {"path": path, "quality": self.get_quality_name(quality), "size": size}
+        self.save()
+
+    def remove(self, track_id):
+        """Deletes the downloaded file of the track"""
+
+        with self.lock:
+            entry = self.entries.pop(str(track_id), None)
+        if entry is None:
+            return
+
+        try:
+            os.remove(entry["path"])
+        except OSError:
+            pass
+        self.save()
+
+    def get_partial_path(self, track_id, quality):
+        """Returns where the track is written while downloading, it's kept
+        after a failed download so that the next attempt can resume it"""
+
+        return os.path.join(self.partial_dir, f"{track_id}-{self.get_quality_name(quality)}.part")
+
+    def get_track_path(self, track, extension):
+        artist = track.artist.name if track.artist else "Unknown Artist"
+        album = track.album.name if track.album else "Unknown Album"
+        # Each disc of an album numbers its tracks from 1, the disc keeps the names unique
+        file_name = f"{track.volume_num or 1}-{track.track_num or 0:02d} - {track.name}.{extension}"
+
+        return os.path.join(self.library_dir, self._clean_name(artist), self._clean_name(album), self._clean_name(file_name))
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "tracks": len(self.entries),
+                "size": sum(entry["size"] for entry in self.entries.values())
+            }
+
+    def get_quality_name(self, quality):
+        """The name of a tidalapi Quality as the service calls it, like HI_RES_LOSSLESS"""
+
+        return str(getattr(quality, "value", quality))
+
+    def _clean_name(self, name):
+        # Names come from the service, they can't be allowed to escape the library folder
+        name = re.sub(r'[/\\\x00-\x1f]', "_", name).strip()
+        return name.lstrip(".") or "_"
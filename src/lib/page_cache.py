@@ -0,0 +1,89 @@
+# page_cache.py
+#
+# Copyright 2023 Nokse
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from collections import OrderedDict
+
+class PageCache():
+    """Keeps the last navigation pages that were left, already built, so that going back
+    to them doesn't rebuild them. Pages are keyed by page type and item id, when there are
+    more than max_pages or their widgets are more than max_widgets (0 for no limit)
+    the least recently used are dropped"""
+
+    def __init__(self, max_pages=10, max_widgets=0):
+        self.max_pages = max_pages
+        self.max_widgets = max_widgets
+
+        self.pages = OrderedDict() # key -> (page, number of widgets), least recently used first
+        self.total_widgets = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def take(self, key):
+        """Removes and returns the page of key, or None"""
+
+        entry = self.pages.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.total_widgets -= entry[1]
+        return entry[0]
+
+    def put(self, key, page):
+        if key in self.pages:
+            self.total_widgets -= self.pages.pop(key)[1]
+
+        n_widgets = self._count_widgets(page)
+        self.pages[key] = (page, n_widgets)
+        self.total_widgets += n_widgets
+
+        self._evict()
+
+    def clear(self):
+        self.pages.clear()
+        self.total_widgets = 0
+
+    def set_limits(self, max_pages, max_widgets):
+        self.max_pages = max_pages
+        self.max_widgets = max_widgets
+        self._evict()
+
+    def get_stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "pages": len(self.pages),
+            "widgets": self.total_widgets
+        }
+
+    def _evict(self):
+        while self.pages and (len(self.pages) > self.max_pages
+                or (self.max_widgets and self.total_widgets > self.max_widgets)):
+            key, (page, n_widgets) = self.pages.popitem(last=False)
+            self.total_widgets -= n_widgets
+
+    def _count_widgets(self, widget):
+        count = 1
+        child = widget.get_first_child()
+        while child:
+            count += self._count_widgets(child)
+            child = child.get_next_sibling()
+        return count
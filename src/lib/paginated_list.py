@@ -0,0 +1,96 @@
+# paginated_list.py
+#
+# Copyright 2023 Nokse
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from . import utils
+
+class PaginatedList():
+    """Loads a long list (favourites, playlist tracks...) one page at a time.
+
+    fetch_function(limit, offset) returns the items of a page, each loaded page is passed
+    to on_items_loaded(items) on the main thread. When watching a scrolled window the
+    next page is loaded as soon as the scroll position gets close to the end. Once
+    cancellable is cancelled no more pages are loaded"""
+
+    def __init__(self, fetch_function, on_items_loaded, page_size=50, cancellable=None):
+        self.fetch_function = fetch_function
+        self.on_items_loaded = on_items_loaded
+        self.page_size = page_size
+        self.cancellable = cancellable
+
+        self.items = [] # All the items loaded so far
+        self.is_loading = False
+        self.is_finished = False
+
+        self.adjustment = None
+
+    def load_next_page(self):
+        if self.is_loading or self.is_finished:
+            return
+
+        self.is_loading = True
+
+        offset = len(self.items)
+        utils.task_runner.run(self._load_page, offset, callback=lambda items: self._on_page_loaded(offset, items),
+                error_callback=lambda e: self._on_page_failed(offset, e), cancellable=self.cancellable)
+
+    def watch_scrolled_window(self, scrolled_window):
+        """Loads the next page when the scrolled window is scrolled close to the end
+        or when the loaded items are not enough to fill it"""
+
+        self.adjustment = scrolled_window.get_vadjustment()
+        self.adjustment.connect("value-changed", self._on_adjustment_changed)
+        self.adjustment.connect("changed", self._on_adjustment_changed)
+
+    def _load_page(self, offset):
+        return list(self.fetch_function(self.page_size, offset))
+
+    def _on_page_failed(self, offset, error):
+        print(f"failed to load page at offset {offset}: {error}")
+        self.is_loading = False
+
+    def resume(self, cancellable=None):
+        """Loads again after being cancelled, with the new cancellable of the page.
+        A page that was loading is requested again"""
+
+        self.cancellable = cancellable
+        self.is_loading = False
+        if self.adjustment:
+            self._on_adjustment_changed(self.adjustment)
+
+    def _on_page_loaded(self, offset, items):
+        if offset != len(self.items):
+            return # Already loaded after resuming
+
+        self.is_loading = False
+
+        if len(items) < self.page_size:
+            self.is_finished = True
+
+        self.items.extend(items)
+        if items:
+            self.on_items_loaded(items)
+
+        if self.adjustment:
+            self._on_adjustment_changed(self.adjustment)
+
+    def _on_adjustment_changed(self, adjustment):
+        # Close to the end means less than a screen of content left below
+        remaining = adjustment.get_upper() - adjustment.get_value() - adjustment.get_page_size()
+        if remaining < adjustment.get_page_size():
+            self.load_next_page()
@@ -0,0 +1,179 @@
+# play_queue.py
+#
+# Copyright 2023 Nokse
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from gi.repository import GObject
+
+from collections import deque
+
+import itertools
+import random
+
+class PlayQueue(GObject.GObject):
+    """Keeps the tracks of the playing album/mix/playlist and the queue.
+
+    The tracks are never moved: a cursor points at the playing one and, when shuffling,
+    the play order is a permutation of their indices. The queue (play next/add to queue)
+    is a deque, so skipping, playing next and adding to the queue are all O(1)"""
+
+    __gsignals__ = {
+        # The tracks or their order changed completely
+        'tracks-changed': (GObject.SignalFlags.RUN_FIRST, None, ()),
+        # The cursor moved from the first to the second position in play order
+        'cursor-changed': (GObject.SignalFlags.RUN_FIRST, None, (int, int)),
+        # Position, removed and added tracks in the queue, like Gio.ListModel items-changed
+        'queue-changed': (GObject.SignalFlags.RUN_FIRST, None, (int, int, int)),
+    }
+
+    def __init__(self):
+        GObject.GObject.__init__(self)
+
+        self.tracks = [] # Tracks of the album/mix/playlist in their original order
+        self.order = None # Permutation of the tracks indices when shuffling, None otherwise
+        self.cursor = -1 # Position in play order of the current track
+
+        self.queue = deque() # Tracks added with play next/add to queue
+
+        self.current = None # The playing track, from the tracks or from the queue
+        self.current_from_queue = False
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def get_track(self, position):
+        """Returns the track at position in play order"""
+
+        if self.order is not None:
+            return self.tracks[self.order[position]]
+        return self.tracks[position]
+
+    def set_tracks(self, tracks, start=0, shuffle=False):
+        """Replaces the tracks and makes the one at index start the current one,
+        when shuffling the other tracks are played in random order after it"""
+
+        self.tracks = list(tracks)
+        self.order = None
+        self.cursor = -1
+        self.current = None
+        self.current_from_queue = False
+
+        if self.tracks:
+            if shuffle:
+                self.order = self._get_shuffled_order(start)
+                self.cursor = 0
+            else:
+                self.cursor = start
+            self.current = self.get_track(self.cursor)
+
+        self.emit("tracks-changed")
+        return self.current
+
+    def set_shuffle(self, shuffle):
+        """Starts or stops shuffling, keeping the current track where it is"""
+
+        if shuffle == (self.order is not None) or not self.tracks:
+            return
+
+        if shuffle:
+            self.order = self._get_shuffled_order(self.cursor)
+            self.cursor = 0
+        else:
+            self.cursor = self.order[self.cursor]
+            self.order = None
+
+        self.emit("tracks-changed")
+
+    def peek_next(self):
+        """Returns the track that next() would return, without moving"""
+
+        if self.queue:
+            return self.queue[0]
+        if not self.tracks:
+            return None
+        return self.get_track((self.cursor + 1) % len(self.tracks))
+
+    def peek_upcoming(self, count):
+        """Returns up to count tracks that will be played next, in order"""
+
+        upcoming = list(itertools.islice(self.queue, count))
+        if self.tracks:
+            for offset in range(1, min(count - len(upcoming), len(self.tracks)) + 1):
+                upcoming.append(self.get_track((self.cursor + offset) % len(self.tracks)))
+        return upcoming
+
+    def next(self):
+        """Moves to the next track, the queue is played first, and returns it.
+        After the last track it starts again from the first one"""
+
+        if self.queue:
+            self.current = self.queue.popleft()
+            self.current_from_queue = True
+            self.emit("queue-changed", 0, 1, 0)
+            return self.current
+
+        if not self.tracks:
+            return None
+
+        self._move_cursor((self.cursor + 1) % len(self.tracks))
+        return self.current
+
+    def previous(self):
+        """Moves to the previous track and returns it. When playing a track from the queue
+        it goes back to the track that was playing before it"""
+
+        if not self.tracks:
+            return None
+
+        if self.current_from_queue:
+            self.current = self.get_track(self.cursor)
+            self.current_from_queue = False
+            return self.current
+
+        self._move_cursor((self.cursor - 1) % len(self.tracks))
+        return self.current
+
+    def add_next(self, track):
+        self.queue.appendleft(track)
+        self.emit("queue-changed", 0, 0, 1)
+
+    def add_to_queue(self, track):
+        self.queue.append(track)
+        self.emit("queue-changed", len(self.queue) - 1, 0, 1)
+
+    def clear_queue(self):
+        removed = len(self.queue)
+        self.queue.clear()
+        if removed:
+            self.emit("queue-changed", 0, removed, 0)
+
+    def _move_cursor(self, position):
+        old_position = self.cursor
+        self.cursor = position
+        self.current = self.get_track(position)
+        self.current_from_queue = False
+        self.emit("cursor-changed", old_position, position)
+
+    def _get_shuffled_order(self, first):
+        """Returns a random permutation of the tracks indices that starts with first"""
+
+        order = list(range(len(self.tracks)))
+        order[0], order[first] = order[first], order[0]
+        rest = order[1:]
+        random.shuffle(rest)
+        order[1:] = rest
+        return order
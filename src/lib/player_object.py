@@ -30,8 +30,16 @@ from tidalapi.user import Favorites
 from gi.repository import GObject
 from gi.repository import Gst, GLib
 
+from .play_queue import PlayQueue
+from . import utils
+
 import random
-import threading
+import time
+
+# Stream urls are signed and expire, a prefetched url older than this is resolved again
+URL_LIFETIME = 10 * 60
+# The prefetched url is resolved again this long before it expires
+URL_REFRESH_MARGIN = 60
 
 class playerObject(GObject.GObject):
     """This class handles all the player logic, queue, shuffle..."""
@@ -46,19 +54,16 @@ class playerObject(GObject.GObject):
         'song-changed': (GObject.SignalFlags.RUN_FIRST, None, ()),
         'song-added-to-queue': (GObject.SignalFlags.RUN_FIRST, None, ()),
         'play-changed': (GObject.SignalFlags.RUN_FIRST, None, (bool,)),
+        'duration-changed': (GObject.SignalFlags.RUN_FIRST, None, ()),
     }
 
     def __init__(self):
         GObject.GObject.__init__(self)
-        self.queue = []  # List to store queued songs (Not the next songs in an album/playlist/mix, but the ones added with play next/add to queue)
 
         self.current_mix_album_playlist = None  # Information about the currently playing mix/album
 
-        self.tracks_to_play = [] # List of all the tracks to play in the current album/mix/playlist
-        self.shuffled_tracks_to_play = []  # Shuffled version of the next tracks to play
-
-        self.played_songs = [] # List of played songs when not shuffling
-        self.shuffled_played_songs = [] # List of played songs when shuffling
+        # Tracks of the current album/mix/playlist and the queued songs (Not the next songs in an album/playlist/mix, but the ones added with play next/add to queue)
+        self.play_queue = PlayQueue()
 
         self.shuffle_mode = False
         self.is_playing = False
@@ -68,28 +73,44 @@ class playerObject(GObject.GObject):
         Gst.init()
 
         self.playbin = Gst.ElementFactory.make("playbin", "playbin")
+        self.playbin.connect("about-to-finish", self.on_about_to_finish)
+
+        bus = self.playbin.get_bus()
+        bus.add_signal_watch()
+        bus.connect("message::stream-start", self.on_stream_start)
+        bus.connect("message::eos", self.on_eos)
+        bus.connect("message::error", self.on_error)
+        bus.connect("message::buffering", self.on_buffering)
+        bus.connect("message::state-changed", self.on_state_changed)
+        bus.connect("message::duration-changed", self.on_duration_changed)
+
+        self.offline_library = None # Downloaded tracks are played from it instead of being streamed
+        self.stream_cache = None # When set the played tracks are cached and the next ones read ahead
+        self.read_ahead = 1 # Number of upcoming tracks cached in advance
+        self.prefetched_url = None # (track id, url, time it was resolved)
+        self.prefetch_timeout_id = None # Resolves the prefetched url again before it expires
+        self.gapless_track = None # Track queued with about-to-finish, it starts without restarting the pipeline
+        self.is_buffering = False
+        self.slider_timeout_id = None
 
         # GLib.timeout_add(4000, self.print_queue_and_list)
-        GLib.timeout_add(1000, self.check_for_end_of_stream)
 
-    def play_this(self, thing, index = 0): # Used to play albums, playlists, mixes
+    def play_this(self, thing, index = 0, tracks = None): # Used to play albums, playlists, mixes
+        # tracks are the ones of thing already loaded, otherwise they are requested
         self.current_mix_album_playlist = thing
-        tracks = self.get_track_list(thing)
-        self.tracks_to_play = tracks[index:] + tracks[:index]
-        track = self.tracks_to_play[0]
-        self.tracks_to_play.pop(0)
+        if tracks is None:
+            tracks = self.get_track_list(thing)
+        track = self.play_queue.set_tracks(tracks, index, self.shuffle_mode)
         self.play_track(track)
         self.play()
 
     def shuffle_this(self, thing): # Same as play_this, but on shuffle
         self.shuffle_mode = True
+        self.notify("shuffle_mode")
 
         self.current_mix_album_playlist = thing
-        self.tracks_to_play = self.get_track_list(thing)
-        self.shuffled_tracks_to_play = self.tracks_to_play.copy()
-        random.shuffle(self.shuffled_tracks_to_play)
-        track = self.shuffled_tracks_to_play[0]
-        self.shuffled_tracks_to_play.pop(0)
+        tracks = self.get_track_list(thing)
+        track = self.play_queue.set_tracks(tracks, random.randrange(len(tracks)), True)
         self.play_track(track)
         self.play()
 
@@ -110,9 +131,8 @@ class playerObject(GObject.GObject):
         self.notify("is_playing")
 
         self.emit("play-changed", self.is_playing)
-        self.playbin.set_state(Gst.State.PLAYING)
-
-        GLib.timeout_add(1000, self.update_slider_call)
+        if not self.is_buffering:
+            self.playbin.set_state(Gst.State.PLAYING)
 
     def pause(self):
         self.is_playing = False
@@ -122,13 +142,22 @@ class playerObject(GObject.GObject):
         self.playbin.set_state(Gst.State.PAUSED)
 
     def play_track(self, track):
-        th = threading.Thread(target=self._play_track, args=(track,))
-        th.deamon = True
-        th.start()
+        """Resolves the track url on a worker thread, then starts playing it on the main thread.
+        Downloaded, cached and prefetched tracks start immediately"""
 
-    def _play_track(self, track):
+        # The task runner can be busy with long jobs, a url that is ready doesn't wait for them
+        ready_url = self.get_ready_track_url(track)
+        if ready_url:
+            self._play_track(track, ready_url)
+            return
+
+        utils.task_runner.run(self.get_track_url, track, callback=lambda music_url: self._play_track(track, music_url),
+                error_callback=lambda e: print(f"failed to play {track.name}: {e}"))
+
+    def _play_track(self, track, music_url):
         print(f"play track: {track.name} by {track.artist.name}, {track.media_metadata_tags}, {track.audio_quality}, {track.id}")
-        music_url = track.get_url()
+        self.gapless_track = None
+        self.is_buffering = False
         self.playbin.set_state(Gst.State.NULL)
 
         self.playbin.set_property("uri", music_url)
@@ -140,85 +169,250 @@ class playerObject(GObject.GObject):
         self.song_album = track.album
         self.emit("song-changed")
 
+        self.prefetch_next_track()
+
     def play_next(self):
         """Play the next song in the queue or from the currently playing album/mix/playlist."""
 
-        # FIXME when not on shuffle it works, on shuffle it doesn't, but I thing the shuffle is not registered
+        track = self._take_next_track()
+        if track:
+            self.play_track(track)
 
-        # Appends the track that just finished playing or was skipped to the played_songs list
-        self.played_songs.append(self.playing_track)
+    def _take_next_track(self):
+        """Moves the queue to the next track and returns it"""
 
         print(f"Shuffle mode is {self.shuffle_mode}")
 
-        # If the queue is not empty it plays the first song in the queue
-        if len(self.queue) != 0:
-            track = self.queue[0]
-            self.queue.pop(0)
+        return self.play_queue.next()
+
+    def peek_next_track(self):
+        """Returns the track that play_next would play, without changing the queue"""
+
+        return self.play_queue.peek_next()
+
+    def play_previous(self):
+        """Play the previous song in the queue."""
+
+        track = self.play_queue.previous()
+        if track:
             self.play_track(track)
+
+    def get_track_url(self, track):
+        """Returns the uri of the downloaded or cached file of the track or its stream url,
+        using the prefetched one if it's still valid"""
+
+        ready_url = self.get_ready_track_url(track)
+        if ready_url:
+            return ready_url
+
+        try:
+            return track.get_url()
+        except Exception:
+            # Without a connection a copy in another quality is better than nothing
+            offline_uri = self.get_offline_uri(track, any_quality=True)
+            if offline_uri:
+                return offline_uri
+            raise
+
+    def get_ready_track_url(self, track):
+        """Returns the uri of the track if it's available without a request, from the
+        offline library, the stream cache or the prefetch, otherwise None"""
+
+        local_uri = self.get_local_uri(track)
+        if local_uri:
+            return local_uri
+
+        if self.prefetched_url:
+            track_id, url, resolved_time = self.prefetched_url
+            if track_id == track.id and time.monotonic() - resolved_time < URL_LIFETIME:
+                return url
+
+        return None
+
+    def get_local_uri(self, track):
+        """Returns the file:// uri of the track in the offline library or in the stream cache"""
+
+        offline_uri = self.get_offline_uri(track)
+        if offline_uri:
+            return offline_uri
+
+        if self.stream_cache is None:
+            return None
+
+        path = self.stream_cache.get(track.id, track.session.audio_quality)
+        if path is None:
+            return None
+        return Gst.filename_to_uri(path)
+
+    def get_offline_uri(self, track, any_quality=False):
+        """Returns the file:// uri of the track in the offline library if it was
+        downloaded in the current quality, or in any quality with any_quality"""
+
+        if self.offline_library is None:
+            return None
+
+        quality = None if any_quality else track.session.audio_quality
+        path = self.offline_library.get(track.id, quality)
+        if path is None:
+            return None
+        return Gst.filename_to_uri(path)
+
+    def prefetch_next_track(self):
+        """Resolves the stream url of the next track in the background, so that changing
+        track doesn't have to wait for it"""
+
+        self._prefetch_next_url()
+        self.fill_stream_cache()
+
+    def _prefetch_next_url(self):
+        if self.prefetch_timeout_id:
+            GLib.source_remove(self.prefetch_timeout_id)
+            self.prefetch_timeout_id = None
+
+        utils.task_runner.run(self._prefetch_next_track, callback=self._on_next_track_prefetched)
+
+    def _on_next_track_prefetched(self, resolved):
+        # The url expires before the end of a long track, it's resolved again in time for about-to-finish
+        if resolved and self.prefetch_timeout_id is None:
+            self.prefetch_timeout_id = GLib.timeout_add_seconds(URL_LIFETIME - URL_REFRESH_MARGIN,
+                    self._on_prefetched_url_expiring)
+
+    def _on_prefetched_url_expiring(self):
+        self.prefetch_timeout_id = None
+        self._prefetch_next_url()
+        return GLib.SOURCE_REMOVE
+
+    def fill_stream_cache(self):
+        """Reads ahead the next tracks into the stream cache, the tracks already downloaded
+        or cached are skipped. The playing track is not cached, playbin is already
+        streaming it and downloading it again would double the traffic"""
+
+        if self.stream_cache is None:
             return
 
-        # If the tracks_to_play list is empty it refills it with the played songs and empties the played_songs
-        if self.tracks_to_play == []:
-            self.tracks_to_play = self.played_songs
-            self.played_songs = []
+        for track in self.play_queue.peek_upcoming(self.read_ahead):
+            if not self.get_offline_uri(track):
+                self.stream_cache.fill(track, track.session.audio_quality)
 
-        # If it's shuffling it plays the first song in the shuffled_tracks_to_play. If it's not on shuffle it will play the first song from tracks_to_play
-        if self.shuffle_mode:
-            track = self.shuffled_tracks_to_play[0]
-            self.shuffled_tracks_to_play.pop(0)
-            self.tracks_to_play.remove(self.playing_track)
-            self.play_track(track)
+    def _prefetch_next_track(self):
+        track = self.peek_next_track()
+        if track is None or self.get_local_uri(track):
             return
-        else:
-            track = self.tracks_to_play[0]
-            self.play_track(track)
-            self.tracks_to_play.pop(0)
+
+        try:
+            self.prefetched_url = (track.id, track.get_url(), time.monotonic())
+        except Exception as e:
+            print(f"failed to prefetch the next track: {e}")
+            return False
+        return True
+
+    def on_about_to_finish(self, playbin):
+        """Called from a GStreamer thread when the current track is almost over, setting the
+        next uri now makes playbin switch to it without a gap"""
+
+        track = self.peek_next_track()
+        if track is None:
             return
 
-    def play_previous(self):
-        """Play the previous song in the queue."""
-        last_index = len(self.played_songs) - 1
-        track = self.played_songs[last_index]
-        self.played_songs.pop(last_index)
-        self.tracks_to_play.insert(0, self.playing_track)
-        self.play_track(track)
+        # This runs on a streaming thread, it must not wait for the network: without
+        # a url already resolved the track is started on EOS as usual
+        music_url = self.get_ready_track_url(track)
+        if music_url is None:
+            return
 
-    def check_for_end_of_stream(self):
-        # FIXME Gstreamer position/duration don't update instantly after changing song (it still returns the previous values)
-        success1, duration = self.query_duration(Gst.Format.TIME)
-        success2, position = self.query_position(Gst.Format.TIME)
+        self.gapless_track = track
+        self.playbin.set_property("uri", music_url)
 
-        # print(f"{position} and {duration}")
+    def on_stream_start(self, bus, message):
+        """Called when a new stream starts playing, if it's the one queued in on_about_to_finish
+        the queue is moved forward without restarting the pipeline"""
 
-        if success1 and success2:
-            if position >= duration - 1:
-                print("song ended")
-                self.play_next()
-                # return False
+        track = self.gapless_track
+        if track is None:
+            return
+        self.gapless_track = None
 
-        return True
+        next_track = self._take_next_track()
+        if next_track is not track:
+            # The queue changed after the next track was queued
+            if next_track:
+                self.play_track(next_track)
+            return
+
+        self.playing_track = track
+        self.song_album = track.album
+        self.emit("song-changed")
+
+        self.prefetch_next_track()
+
+    def on_eos(self, bus, message):
+        print("song ended")
+        self.play_next()
+
+    def on_error(self, bus, message):
+        error, debug = message.parse_error()
+        print(f"playback error: {error.message} ({debug})")
+
+        self.gapless_track = None
+        self.is_buffering = False
+        self.playbin.set_state(Gst.State.NULL)
+        if self.is_playing:
+            self.pause()
+
+    def on_buffering(self, bus, message):
+        """Pauses the pipeline while the network stream is buffering, without changing is_playing"""
+
+        percent = message.parse_buffering()
+        if percent < 100 and not self.is_buffering:
+            self.is_buffering = True
+            if self.is_playing:
+                self.playbin.set_state(Gst.State.PAUSED)
+        elif percent == 100 and self.is_buffering:
+            self.is_buffering = False
+            if self.is_playing:
+                self.playbin.set_state(Gst.State.PLAYING)
+
+    def on_state_changed(self, bus, message):
+        if message.src != self.playbin:
+            return
+
+        old_state, new_state, pending_state = message.parse_state_changed()
+
+        # The slider is only updated every second while actually playing
+        if new_state == Gst.State.PLAYING and self.slider_timeout_id is None:
+            self.slider_timeout_id = GLib.timeout_add(1000, self.update_slider_call)
+        self.emit("update-slider")
+
+    def on_duration_changed(self, bus, message):
+        self.emit("duration-changed")
 
     def print_queue_and_list(self):
         return
+        queue = self.play_queue
         print("----------played songs----------")
-        for track in self.played_songs:
-            print(track.name)
+        for position in range(queue.cursor):
+            print(queue.get_track(position).name)
         print(f"PLAYING: {self.playing_track.name}")
         print("-------------queue--------------")
-        for track in self.queue:
+        for track in queue.queue:
             print(track.name)
         print("---------songs to play----------")
-        for track in self.tracks_to_play:
-            print(track.name)
+        for position in range(queue.cursor + 1, len(queue)):
+            print(queue.get_track(position).name)
 
         return True
 
     def add_to_queue(self, track):
-        self.queue.append(track)
+        self.play_queue.add_to_queue(track)
         self.emit("song-added-to-queue")
 
+        if len(self.play_queue.queue) == 1:
+            self.prefetch_next_track()
+
     def add_next(self, track):
-        self.queue.insert(0, track)
+        self.play_queue.add_next(track)
+
+        self.prefetch_next_track()
 
     def change_volume(self, value):
         self.playbin.set_property("volume", value)
@@ -227,9 +421,12 @@ class playerObject(GObject.GObject):
         """Enable or disable shuffle mode."""
         print(f"shuffle toggled to {state}")
         self.shuffle_mode = state
+        self.play_queue.set_shuffle(state)
 
         self.notify("shuffle_mode")
 
+        self.prefetch_next_track()
+
         # self.emit("songs-list-changed", self.shuffle_mode)
 
     def get_current_song(self):
@@ -238,8 +435,7 @@ class playerObject(GObject.GObject):
 
     def clear_queue(self):
         """Clear the queue."""
-        self.queue = []
-        self.shuffled_queue = []
+        self.play_queue.clear_queue()
         self.current_song_index = -1
 
     def set_current_mix_album_playlist(self, mix_album):
@@ -250,6 +446,7 @@ class playerObject(GObject.GObject):
         self.emit("update-slider")
         if self.is_playing:
             return True
+        self.slider_timeout_id = None
         return False
 
     def query_duration(self, time_format):
@@ -0,0 +1,102 @@
+# queue_model.py
+#
+# Copyright 2023 Nokse
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from gi.repository import GObject, Gio
+
+from .track_item import TrackItem
+
+class PlayQueueModel(GObject.Object, Gio.ListModel):
+    """List model showing one section of a PlayQueue: the played tracks, the queue or
+    the tracks still to play. It follows the PlayQueue signals and only reports the rows
+    that changed, so the list views showing it don't have to be rebuilt"""
+
+    PLAYED = "played"
+    QUEUE = "queue"
+    UPCOMING = "upcoming"
+
+    def __init__(self, play_queue, section):
+        super().__init__()
+
+        self.play_queue = play_queue
+        self.section = section
+
+        self.n_items = self._count_items()
+
+        play_queue.connect("tracks-changed", self._on_tracks_changed)
+        if section == self.QUEUE:
+            play_queue.connect("queue-changed", self._on_queue_changed)
+        else:
+            play_queue.connect("cursor-changed", self._on_cursor_changed)
+
+    def do_get_item_type(self):
+        return TrackItem.__gtype__
+
+    def do_get_n_items(self):
+        return self.n_items
+
+    def do_get_item(self, position):
+        if position >= self.n_items:
+            return None
+
+        if self.section == self.PLAYED:
+            track = self.play_queue.get_track(position)
+        elif self.section == self.QUEUE:
+            track = self.play_queue.queue[position]
+        else:
+            track = self.play_queue.get_track(self.play_queue.cursor + 1 + position)
+
+        return TrackItem(track, self.section)
+
+    def _count_items(self):
+        if self.section == self.QUEUE:
+            return len(self.play_queue.queue)
+        if not len(self.play_queue):
+            return 0
+        if self.section == self.PLAYED:
+            return self.play_queue.cursor
+        return len(self.play_queue) - self.play_queue.cursor - 1
+
+    def _on_tracks_changed(self, play_queue):
+        if self.section == self.QUEUE:
+            return
+
+        removed = self.n_items
+        self.n_items = self._count_items()
+        self.items_changed(0, removed, self.n_items)
+
+    def _on_queue_changed(self, play_queue, position, removed, added):
+        self.n_items = self._count_items()
+        self.items_changed(position, removed, added)
+
+    def _on_cursor_changed(self, play_queue, old_position, new_position):
+        self.n_items = self._count_items()
+        moved = abs(new_position - old_position)
+
+        # Moving forward the played tracks grow at the end and the upcoming ones shrink
+        # at the start, moving back (or starting again from the first) it's the opposite
+        if self.section == self.PLAYED:
+            if new_position > old_position:
+                self.items_changed(old_position, 0, moved)
+            else:
+                self.items_changed(new_position, moved, 0)
+        else:
+            if new_position > old_position:
+                self.items_changed(0, moved, 0)
+            else:
+                self.items_changed(0, 0, moved)
@@ -0,0 +1,84 @@
+# search_cache.py
+#
+# Copyright 2023 Nokse
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from collections import OrderedDict
+
+import threading
+
+class SearchCache():
+    """Keeps the results of the last searches, keyed by query, types and limit.
+    When there are more than max_entries the least recently used are dropped"""
+
+    RESULT_LISTS = ["artists", "albums", "playlists", "tracks", "videos"]
+
+    def __init__(self, max_entries=100):
+        self.max_entries = max_entries
+
+        self.entries = OrderedDict() # key -> results, least recently used first
+        self.lock = threading.Lock()
+
+    def get_key(self, query, types, limit):
+        return (query.strip().lower(), tuple(sorted(type_.__name__ for type_ in types)), limit)
+
+    def get(self, key):
+        with self.lock:
+            results = self.entries.get(key)
+            if results is not None:
+                self.entries.move_to_end(key)
+            return results
+
+    def put(self, key, results):
+        with self.lock:
+            self.entries[key] = results
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def refine(self, key):
+        """Returns the results of the longest cached query that the query of key starts with,
+        filtered to the items whose name contains the query, or None if there isn't such a query.
+        The service also matches other fields and ranks the results, so they are only a preview
+        to show while the real search runs and must never be cached"""
+
+        query, types, limit = key
+
+        with self.lock:
+            best_key = None
+            for cached_key in self.entries:
+                cached_query, cached_types, cached_limit = cached_key
+                if (cached_types == types and cached_limit == limit and query.startswith(cached_query)
+                        and (best_key is None or len(cached_query) > len(best_key[0]))):
+                    best_key = cached_key
+            if best_key is None:
+                return None
+            cached_results = self.entries[best_key]
+
+        results = {}
+        for name, items in cached_results.items():
+            if name in self.RESULT_LISTS:
+                results[name] = [item for item in items if query in self._get_name(item).lower()]
+            elif name == "top_hit":
+                results[name] = items if items and query in self._get_name(items).lower() else None
+            else:
+                results[name] = items
+
+        return results
+
+    def _get_name(self, item):
+        return getattr(item, "name", None) or getattr(item, "title", None) or ""
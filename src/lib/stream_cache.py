@@ -0,0 +1,148 @@
+# stream_cache.py
+#
+# Copyright 2023 Nokse
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from gi.repository import GLib
+
+import os
+import queue
+import tempfile
+import threading
+import time
+
+from . import utils
+from .disk_cache import DiskCache
+
+class StreamCache(DiskCache):
+    """On-disk cache of the played tracks, keyed by track id and quality, so that playing
+    a track again doesn't stream it again. When the files take more than max_size bytes
+    the least recently played are deleted.
+
+    Tracks are added with fill(), which downloads them on a single background thread,
+    the player uses it to read ahead the next tracks"""
+
+    NAME = "stream cache"
+    EXTENSION = ".audio"
+
+    # Temporary files not written for this long are leftovers of an interrupted download
+    STALE_TMP_AGE = 60 * 60
+
+    def __init__(self, cache_dir=None, max_size=1024 * 1024 * 1024, chunk_size=256 * 1024):
+        if cache_dir is None:
+            cache_dir = os.path.join(GLib.get_user_cache_dir(), "high-tide", "streams")
+
+        super().__init__(cache_dir, max_size)
+        self.chunk_size = chunk_size
+
+        self.pending = set() # keys of the tracks queued or being downloaded
+
+        self.hits = 0
+        self.misses = 0
+
+        self.queue = queue.Queue()
+
+        th = threading.Thread(target=self._worker, name="stream-cache")
+        th.daemon = True
+        th.start()
+
+    def _on_other_file(self, entry):
+        # Leftovers of interrupted downloads are deleted, the download running on
+        # the worker keeps writing its file, so it's never considered a leftover
+        if not entry.name.endswith(".tmp"):
+            return
+        try:
+            if time.time() - entry.stat().st_mtime > self.STALE_TMP_AGE:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+    def get_key(self, track_id, quality):
+        return f"{track_id}-{getattr(quality, 'value', quality)}"
+
+    def get(self, track_id, quality):
+        """Returns the path of the cached track or None if it is not cached"""
+
+        path = self.lookup(self.get_key(track_id, quality))
+
+        with self.lock:
+            if path is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return path
+
+    def fill(self, track, quality):
+        """Downloads the track in the background if it's not cached yet"""
+
+        key = self.get_key(track.id, quality)
+
+        with self.lock:
+            if key in self.entries or key in self.pending:
+                return
+            self.pending.add(key)
+
+        self.queue.put((key, track, quality))
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "tracks": len(self.entries),
+                "size": self.total_size
+            }
+
+    def _worker(self):
+        while True:
+            key, track, quality = self.queue.get()
+
+            try:
+                self._download(key, track, quality)
+            except Exception as e:
+                print(f"failed to cache {track.id}: {e}")
+
+            with self.lock:
+                self.pending.discard(key)
+
+    def _download(self, key, track, quality):
+        if track.session.audio_quality != quality:
+            return # The stream url would be for another quality
+
+        url = track.get_url()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file, utils.http_client.get(url, stream=True) as response:
+                response.raise_for_status()
+                total = int(response.headers.get("Content-Length", 0)) or None
+                size = 0
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    file.write(chunk)
+                    size += len(chunk)
+
+            if total is not None and size != total:
+                raise IOError(f"downloaded {size} bytes of {total}")
+
+            os.replace(tmp_path, self.get_path(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        self.add_entry(key, size)
@@ -0,0 +1,124 @@
+# task_runner.py
+#
+# Copyright 2023 Nokse
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from gi.repository import GLib
+
+import queue
+import threading
+import time
+
+class _Task():
+    def __init__(self, function, args, callback, error_callback, cancellable):
+        self.function = function
+        self.args = args
+        self.callback = callback
+        self.error_callback = error_callback
+        self.cancellable = cancellable
+        self.queued_time = time.monotonic()
+
+    def is_cancelled(self):
+        return self.cancellable is not None and self.cancellable.is_cancelled()
+
+class TaskRunner():
+    """Runs blocking work, like calls to the service, on a fixed number of worker threads.
+
+    The result of function(*args) is passed to callback(result) on the main thread, the
+    exception it raised to error_callback(exception). Tasks with a Gio.Cancellable that gets
+    cancelled are skipped if not yet started and their callbacks are never called, so a page
+    that is gone doesn't receive results. Widgets must only be touched from the callbacks"""
+
+    def __init__(self, n_workers=8):
+        self.queue = queue.Queue()
+
+        self.lock = threading.Lock()
+        self.running = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.total_wait_time = 0
+        self.total_run_time = 0
+        self.max_wait_time = 0
+
+        for index in range(n_workers):
+            th = threading.Thread(target=self._worker, name=f"task-runner-{index}")
+            th.daemon = True
+            th.start()
+
+    def run(self, function, *args, callback=None, error_callback=None, cancellable=None):
+        self.queue.put(_Task(function, args, callback, error_callback, cancellable))
+
+    def get_stats(self):
+        with self.lock:
+            started = self.completed + self.failed
+            return {
+                "queued": self.queue.qsize(),
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "average wait": self.total_wait_time / started if started else 0,
+                "max wait": self.max_wait_time,
+                "average run time": self.total_run_time / started if started else 0
+            }
+
+    def _worker(self):
+        while True:
+            task = self.queue.get()
+
+            if task.is_cancelled():
+                with self.lock:
+                    self.cancelled += 1
+                continue
+
+            start_time = time.monotonic()
+            wait_time = start_time - task.queued_time
+            with self.lock:
+                self.running += 1
+
+            try:
+                result = task.function(*task.args)
+            except Exception as e:
+                error = e
+                result = None
+            else:
+                error = None
+
+            with self.lock:
+                self.running -= 1
+                self.total_wait_time += wait_time
+                self.max_wait_time = max(self.max_wait_time, wait_time)
+                self.total_run_time += time.monotonic() - start_time
+                if error:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+
+            GLib.idle_add(self._deliver, task, result, error)
+
+    def _deliver(self, task, result, error):
+        if task.is_cancelled():
+            return
+
+        if error:
+            if task.error_callback:
+                task.error_callback(error)
+            else:
+                print(f"{task.function.__name__} failed: {error}")
+        elif task.callback:
+            task.callback(result)
@@ -0,0 +1,85 @@
+# texture_cache.py
+#
+# Copyright 2023 Nokse
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from collections import OrderedDict
+
+import threading
+
+class TextureCache():
+    """In memory cache of the decoded images, shared by all the pages and the player bar.
+    When the textures take more than max_size bytes the least recently used are dropped"""
+
+    def __init__(self, max_size=64 * 1024 * 1024):
+        self.max_size = max_size
+
+        self.textures = OrderedDict() # key -> (texture, size in bytes), least recently used first
+        self.total_size = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        self.lock = threading.Lock()
+
+    def get_key(self, item, size):
+        """Images are identified by the item type and id, the url is used for items without an id"""
+
+        item_id = getattr(item, "id", None)
+        if item_id is None:
+            return (item.image(), size)
+        return (type(item).__name__, item_id, size)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.textures.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.textures.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, texture):
+        texture_size = texture.get_width() * texture.get_height() * 4
+
+        with self.lock:
+            if key in self.textures:
+                self.total_size -= self.textures.pop(key)[1]
+            self.textures[key] = (texture, texture_size)
+            self.total_size += texture_size
+            self._evict()
+
+    def set_max_size(self, max_size):
+        with self.lock:
+            self.max_size = max_size
+            self._evict()
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "textures": len(self.textures),
+                "size": self.total_size
+            }
+
+    def _evict(self):
+        # The most recent texture is always kept, even if it's bigger than max_size
+        while self.total_size > self.max_size and len(self.textures) > 1:
+            key, (texture, texture_size) = self.textures.popitem(last=False)
+            self.total_size -= texture_size
@@ -0,0 +1,31 @@
+# track_item.py
+#
+# Copyright 2023 Nokse
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from gi.repository import GObject
+
+class TrackItem(GObject.Object):
+    __gtype_name__ = 'TrackItem'
+
+    """Lightweight wrapper used to store tracks in list models"""
+
+    def __init__(self, track, section=None):
+        super().__init__()
+
+        self.track = track
+        self.section = section # Set for the tracks of the queue sidebar
@@ -22,6 +22,7 @@ from gi.repository import Gtk
 from gi.repository import GLib
 from gi.repository import Gio
 from gi.repository import Gdk
+from gi.repository import GdkPixbuf
 
 import tidalapi
 from tidalapi.page import PageItem, PageLink
@@ -32,8 +33,26 @@ from tidalapi.media import Track
 from tidalapi.playlist import Playlist
 from tidalapi.user import Favorites
 
-import requests
-from pathlib import Path
+
+from .image_cache import ImageCache
+from .image_loader import ImageLoader
+from .http_client import HTTPClient
+from .texture_cache import TextureCache
+from .task_runner import TaskRunner
+
+image_cache = ImageCache()
+texture_cache = TextureCache()
+http_client = HTTPClient()
+
+# Runs all the blocking calls to the service, results are delivered on the main thread
+task_runner = TaskRunner()
+
+# Sizes in pixels at which the images are displayed
+CARD_IMAGE_SIZE = 155
+SMALL_IMAGE_SIZE = 44
+HEADER_IMAGE_SIZE = 160
+PLAYER_IMAGE_SIZE = 200
+AVATAR_IMAGE_SIZE = 140
 
 def pretty_duration(secs):
     if not secs:
@@ -50,57 +69,51 @@ def pretty_duration(secs):
 
     return "00:00"
 
-def add_image(image_widget, item):
+def _get_image_file(item, resolution=None):
 
-    """Retrieves and adds an image"""
+    """Returns the path of the item image, downloading it only if it's not already in the cache"""
 
-    file_path = Path(f"tmp_img/{item.id}.jpg")
+    image_url = item.image(resolution) if resolution else item.image()
 
-    if file_path.is_file():
-        GLib.idle_add(_add_image, image_widget, str(file_path))
+    file_path = image_cache.get(image_url, resolution)
+    if file_path:
+        return file_path
 
-    try:
-        image_url = item.image()
-        response = requests.get(image_url)
-    except Exception as e:
-        print(str(e))
-        return
-    if response.status_code == 200:
-        image_data = response.content
+    response = http_client.get(image_url)
+    if response.status_code != 200:
+        return None
 
-        with open(file_path, "wb") as file:
-            file.write(image_data)
+    return image_cache.put(image_url, response.content, resolution)
 
-        GLib.idle_add(_add_image, image_widget, str(file_path))
+def _get_image_texture(item, size):
 
-def _add_image(image_widget, file_path):
-        image_widget.set_from_file(file_path)
+    """Returns the item image decoded and scaled to size, it's called on the image loader threads
+    so that the main thread doesn't have to decode and scale the full size image"""
 
-def add_image_to_avatar(avatar_widget, item):
+    file_path = _get_image_file(item)
+    if not file_path:
+        return None
 
-    """Same ad the previous function, but for Adwaita's avatar widgets"""
+    pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(file_path, size, size, True)
+    return Gdk.Texture.new_for_pixbuf(pixbuf)
 
-    def _add_image_to_avatar(avatar_widget, file_path):
-            file = Gio.File.new_for_path(file_path)
-            image = Gdk.Texture.new_from_file(file)
-            avatar_widget.set_custom_image(image)
+image_loader = ImageLoader(_get_image_texture, texture_cache)
 
-    file_path = Path(f"tmp_img/{item.id}.jpg")
+def add_image(image_widget, item, cancellable=None, size=CARD_IMAGE_SIZE):
 
-    if file_path.is_file():
-        GLib.idle_add(_add_image_to_avatar, avatar_widget, str(file_path))
+    """Queues the item image to be added to the image widget, the request is dropped
+    when cancellable (the one of the page that requested it) is cancelled"""
 
-    try:
-        image_url = item.image()
-        response = requests.get(image_url)
-    except Exception as e:
-        print(str(e))
-        artist_picture.set_icon_name("emblem-music-symbolic")
-        return
-    if response.status_code == 200:
-        image_data = response.content
+    image_loader.load(image_widget, item, _add_image, size * image_widget.get_scale_factor(), cancellable)
+
+def _add_image(image_widget, texture):
+        image_widget.set_from_paintable(texture)
+
+def add_image_to_avatar(avatar_widget, item, cancellable=None, size=AVATAR_IMAGE_SIZE):
+
+    """Same ad the previous function, but for Adwaita's avatar widgets"""
 
-        with open(file_path, "wb") as file:
-            file.write(image_data)
+    image_loader.load(avatar_widget, item, _add_image_to_avatar, size * avatar_widget.get_scale_factor(), cancellable)
 
-        GLib.idle_add(_add_image_to_avatar, avatar_widget, str(file_path))
+def _add_image_to_avatar(avatar_widget, texture):
+        avatar_widget.set_custom_image(texture)
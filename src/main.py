@@ -17,6 +17,9 @@
 #
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+from . import startup_profiler
+
+import os
 import sys
 import gi
 
@@ -26,12 +29,15 @@ gi.require_version('Gst', '1.0')
 
 from gi.repository import Gtk, Gio, Adw, Gdk
 from .window import TidalWindow
+from .lib import utils
 
 from tidalapi.media import Quality
 
-import threading
-import os
-import shutil
+
+startup_profiler.mark("imports")
+
+# With it set the statistics of the caches are printed on quit
+STATS_ENV_VAR = "HIGH_TIDE_PRINT_STATS"
 
 class TidalApplication(Adw.Application):
     """The main application singleton class."""
@@ -133,17 +139,10 @@ class TidalApplication(Adw.Application):
             css_provider,
             Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION)
 
-        folder_path = "tmp_img"
-
-        if os.path.exists(folder_path):
-            shutil.rmtree(folder_path)
-
-        os.makedirs(folder_path)
+        startup_profiler.mark("application")
 
     def on_download(self, *args):
-        th = threading.Thread(target=self.win.download_song)
-        th.deamon = True
-        th.start()
+        self.win.download_song()
 
     def on_login_action(self, *args):
         self.win.new_login()
@@ -212,13 +211,28 @@ class TidalApplication(Adw.Application):
             self.win.settings.set_int("last-playing-song-id", track_id)
             self.win.settings.set_string("last-playing-list-id", list_id)
 
-        folder_path = "tmp_img"
+        startup_profiler.dump()
+
+        utils.image_cache.save_index()
+        self.win.metadata_cache.close()
+        if self.win.stream_cache:
+            self.win.stream_cache.save_index()
+
+        if os.environ.get(STATS_ENV_VAR):
+            self.print_stats()
 
-        # FIXME Directory not empty: 'tmp_img'
-        if os.path.exists(folder_path):
-            shutil.rmtree(folder_path)
+    def print_stats(self):
+        """Prints how the caches and the workers performed, for debugging"""
 
-        os.makedirs(folder_path)
+        print(f"http connections: {utils.http_client.get_stats()}")
+        print(f"texture cache: {utils.texture_cache.get_stats()}")
+        print(f"metadata cache: {self.win.metadata_cache.get_stats()}")
+        print(f"tasks: {utils.task_runner.get_stats()}")
+        print(f"page cache: {self.win.page_cache.get_stats()}")
+        if self.win.download_manager:
+            print(f"downloads: {self.win.download_manager.get_stats()}")
+        if self.win.stream_cache:
+            print(f"stream cache: {self.win.stream_cache.get_stats()}")
 
 def main(version):
     """The application's entry point."""
@@ -1,9 +1,23 @@
-from .home_page import homePage
-from .single_type_page import singleTypePage
-from .explore_page import explorePage
-from .artist_page import artistPage
-from .search_page import searchPage
-from .track_radio_page import trackRadioPage
-from .playlist_page import playlistPage
-from .start_up_page import startUpPage
-from .not_logged_in_page import notLoggedInPage
+import importlib
+
+# Each page module is imported the first time one of its pages is shown
+_PAGE_MODULES = {
+    "homePage": ".home_page",
+    "singleTypePage": ".single_type_page",
+    "explorePage": ".explore_page",
+    "artistPage": ".artist_page",
+    "searchPage": ".search_page",
+    "trackRadioPage": ".track_radio_page",
+    "playlistPage": ".playlist_page",
+    "startUpPage": ".start_up_page",
+    "notLoggedInPage": ".not_logged_in_page",
+}
+
+def __getattr__(name):
+    module_name = _PAGE_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    page_class = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = page_class
+    return page_class
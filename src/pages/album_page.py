@@ -33,7 +33,6 @@ from tidalapi.playlist import Playlist
 
 from ..lib import utils
 
-import threading
 import requests
 import random
 
@@ -42,14 +41,27 @@ from .page import Page
 class albumPage(Page):
     __gtype_name__ = 'albumPage'
 
+    is_cacheable = True
+
     """It is used to display an album"""
 
+    def _fetch_page(self):
+        self.tracks = self.window.metadata_cache.get("album-tracks", self.item.id, self.item.items)
+
+    def get_content_signature(self):
+        return tuple(track.id for track in self.tracks)
+
+    def _check_freshness(self):
+        tracks = self.window.metadata_cache.get("album-tracks", self.item.id, self.item.items)
+        return tuple(track.id for track in tracks)
+
     def _load_page(self):
         builder = Gtk.Builder.new_from_resource("/io/github/nokse22/high-tide/ui/pages_ui/tracks_list_template.ui")
 
         page_content = builder.get_object("_main")
-        tracks_list_box = builder.get_object("_list_box")
-        tracks_list_box.connect("row-activated", self.on_row_selected)
+        tracks_list_view = builder.get_object("_list_view")
+        tracks_list_view.connect("activate", self.on_row_selected)
+        tracks_store = self.setup_track_list_view(tracks_list_view, True, header=builder.get_object("_header"))
 
         builder.get_object("_title_label").set_label(self.item.name)
         builder.get_object("_first_subtitle_label").set_label(self.item.artist.name)
@@ -57,22 +69,16 @@ class albumPage(Page):
 
         builder.get_object("_play_button").connect("clicked", self.on_play_button_clicked)
         builder.get_object("_shuffle_button").connect("clicked", self.on_shuffle_button_clicked)
-        builder.get_object("_add_to_my_collection_button").connect("clicked", self.on_add_to_my_collection_button_clicked)
+        self.setup_download_button(builder.get_object("_download_button"))
+        self.setup_favourite_button(builder.get_object("_add_to_my_collection_button"))
 
         image = builder.get_object("_image")
-        th = threading.Thread(target=utils.add_image, args=(image, self.item))
-        th.deamon = True
-        th.start()
+        utils.add_image(image, self.item, self.cancellable, utils.HEADER_IMAGE_SIZE)
 
-        for index, track in enumerate(self.item.items()):
-            listing = self.get_album_track_listing(track)
-            listing.set_name(str(index))
-            tracks_list_box.append(listing)
+        self.append_tracks(tracks_store, self.tracks)
 
         self.content.remove(self.spinner)
         self.content.append(page_content)
 
-    def on_row_selected(self, list_box, row):
-        index = int(row.get_name())
-
+    def on_row_selected(self, list_view, index):
         self.window.player_object.play_this(self.item, index)
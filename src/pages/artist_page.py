@@ -33,7 +33,6 @@ from tidalapi.playlist import Playlist
 
 from ..lib import utils
 
-import threading
 import requests
 import random
 import copy
@@ -43,6 +42,8 @@ from .page import Page
 class artistPage(Page):
     __gtype_name__ = 'artistPage'
 
+    is_cacheable = True
+
     """It is used to display an artist page"""
 
     # FIXME The bio is not displayed properly, it all bold and the links are not working
@@ -52,6 +53,7 @@ class artistPage(Page):
         super().__init__(_window, _item, _name)
 
         self.top_tracks = []
+        self.albums = []
 
     def _load_page(self):
 
@@ -70,67 +72,76 @@ class artistPage(Page):
         builder.get_object("_play_button").connect("clicked", self.on_play_button_clicked)
         builder.get_object("_shuffle_button").connect("clicked", self.on_shuffle_button_clicked)
 
-        builder.get_object("_follow_button").connect("clicked", self.on_add_to_my_collection_button_clicked)
+        self.setup_favourite_button(builder.get_object("_follow_button"))
         builder.get_object("_radio_button").connect("clicked", self.on_artist_radio_button_clicked)
 
         image = builder.get_object("_image")
 
-        try:
-            self.top_tracks = self.item.get_top_tracks(10)
-        except:
-            pass
-        else:
-            for index, track in enumerate(self.top_tracks):
-                listing = self.get_track_listing(track)
-                listing.set_name(str(index))
-                top_tracks_list_box.append(listing)
-
-        carousel, cards_box = self.get_carousel("Albums")
-        carousel_box.append(carousel)
-
-        try:
-            albums = self.item.get_albums()
-        except:
-            pass
-        else:
-            for album in albums:
-                album_card = self.get_album_card(album)
-                cards_box.append(album_card)
-
-        carousel, cards_box = self.get_carousel("Similar Artists")
-        carousel_box.append(carousel)
-
-        this_artist = self.window.session.artist(self.item.id)
-        try:
-            artists = this_artist.get_similar()
-        except:
-            pass
-        else:
-            for artist in artists:
-                artist_card = self.get_artist_card(artist)
-                cards_box.append(artist_card)
-
-        try:
-            bio = self.item.get_bio()
-        except:
-            pass
-        else:
-            expander = Gtk.Expander(label="Bio", css_classes=["title-3"], margin_bottom=50)
-            label = Gtk.Label(label=bio, wrap=True, css_classes=[])
-            expander.set_child(label)
-            carousel_box.append(expander)
+        albums_carousel, self.albums_box = self.get_carousel("Albums")
+        carousel_box.append(albums_carousel)
+
+        similar_carousel, self.similar_box = self.get_carousel("Similar Artists")
+        carousel_box.append(similar_carousel)
+
+        self.carousel_box = carousel_box
+        self.top_tracks_list_box = top_tracks_list_box
 
         artist_picture = builder.get_object("_avatar")
 
-        th = threading.Thread(target=utils.add_image_to_avatar, args=(artist_picture, self.item))
-        th.deamon = True
-        th.start()
+        utils.add_image_to_avatar(artist_picture, self.item, self.cancellable)
 
         self.content.remove(self.spinner)
         self.content.append(page_content)
 
+        # The sections don't depend on each other, they are requested at the same time
+        # and each one is shown as soon as it arrives
+        cache = self.window.metadata_cache
+        item_id = self.item.id
+        self._load_section(self._add_top_tracks,
+                lambda: cache.get("artist-top-tracks", item_id, lambda: self.item.get_top_tracks(10)))
+        self._load_section(self._add_albums,
+                lambda: cache.get("artist-albums", item_id, self.item.get_albums))
+        self._load_section(self._add_similar_artists,
+                lambda: cache.get("artist-similar", item_id, self.item.get_similar))
+        self._load_section(self._add_bio,
+                lambda: cache.get("artist-bio", item_id, self.item.get_bio))
+
+    def get_content_signature(self):
+        return (tuple(track.id for track in self.top_tracks), tuple(album.id for album in self.albums))
+
+    def _check_freshness(self):
+        cache = self.window.metadata_cache
+        top_tracks = cache.get("artist-top-tracks", self.item.id, lambda: self.item.get_top_tracks(10))
+        albums = cache.get("artist-albums", self.item.id, self.item.get_albums)
+        return (tuple(track.id for track in top_tracks), tuple(album.id for album in albums))
+
+    def _load_section(self, add_function, fetch_function):
+        self.run_task(fetch_function, callback=add_function,
+                error_callback=lambda e: print(f"failed to load artist section: {e}"))
+
+    def _add_top_tracks(self, top_tracks):
+        self.top_tracks = top_tracks
+        for track in self.top_tracks:
+            listing = self.get_track_listing(track)
+            self.top_tracks_list_box.append(listing)
+
+    def _add_albums(self, albums):
+        self.albums = albums
+        for album in albums:
+            self.albums_box.append(album)
+
+    def _add_similar_artists(self, artists):
+        for artist in artists:
+            self.similar_box.append(artist)
+
+    def _add_bio(self, bio):
+        expander = Gtk.Expander(label="Bio", css_classes=["title-3"], margin_bottom=50)
+        label = Gtk.Label(label=bio, wrap=True, css_classes=[])
+        expander.set_child(label)
+        self.carousel_box.append(expander)
+
     def on_row_selected(self, list_box, row):
-        index = int(row.get_name())
+        index = row.get_index()
 
         self.window.player_object.current_mix_album_list = self.top_tracks
         track = self.window.player_object.current_mix_album_list[index]
@@ -152,6 +163,4 @@ class artistPage(Page):
 
     def on_artist_radio_button_clicked(self, btn):
         from .track_radio_page import trackRadioPage
-        page = trackRadioPage(self.window, self.item, f"Radio of {self.item.name}")
-        page.load()
-        self.window.navigation_view.push(page)
+        self.window.push_page(trackRadioPage, self.item, f"Radio of {self.item.name}")
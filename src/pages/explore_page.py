@@ -42,57 +42,63 @@ from .page import Page
 class explorePage(Page):
     __gtype_name__ = 'explorePage'
 
+    is_cacheable = True
+
     """It is used to display the explore page"""
 
+    def _fetch_page(self):
+        # The cached explore page is shown right away, if it's old it's refreshed in the background
+        self.explore = self.window.metadata_cache.get_stale_while_revalidate("explore", self.window.session.user.id,
+                self.window.session.explore, self.on_explore_refreshed, self.cancellable)
+
+    def _check_freshness(self):
+        # Only a cache lookup, the explore page is refreshed in the background if it's old
+        self._fetch_page()
+        return None
+
     def _load_page(self):
         builder = Gtk.Builder.new_from_resource("/io/github/nokse22/high-tide/ui/pages_ui/home_page_template.ui")
 
         page_content = builder.get_object("_main")
         explore_content = builder.get_object("_content")
 
-        explore = self.window.session.explore()
-
-        # print(explore.categories)
-
-        for index, category in enumerate(explore.categories):
-            items = []
-
-            if isinstance(category.items[0], PageLink):
-                carousel, flow_box_box = self.get_link_carousel(category.title if category.title else "More")
-
-                flow_box = Gtk.FlowBox(homogeneous=True, height_request=100)
-                flow_box_box.append(flow_box)
-                explore_content.append(carousel)
-            else:
-                carousel, cards_box = self.get_carousel(category.title)
-                explore_content.append(carousel)
-
-            buttons_for_page = 0
-
-            for index, item in enumerate(category.items):
-                if isinstance(item, PageItem): # Featured
-                    button = self.get_page_item_card(item)
-                    cards_box.append(button)
-                elif isinstance(item, PageLink): # Generes and moods
-                    if buttons_for_page == 4:
-                        flow_box = Gtk.FlowBox(homogeneous=True, height_request=100)
-                        flow_box_box.append(flow_box)
-                        buttons_for_page = 0
-                    button = self.get_page_link_card(item)
-                    flow_box.append(button)
-                    buttons_for_page += 1
-                elif isinstance(item, Mix): # Mixes and for you
-                    button = self.get_mix_card(item)
-                    cards_box.append(button)
-                elif isinstance(item, Album):
-                    album_card = self.get_album_card(item)
-                    cards_box.append(album_card)
-                elif isinstance(item, Artist):
-                    button = self.get_artist_card(item)
-                    cards_box.append(button)
-                elif isinstance(item, Playlist):
-                    button = self.get_playlist_card(item)
-                    cards_box.append(button)
+        # print(self.explore.categories)
+
+        self.explore_content = explore_content
+        self.set_categories(explore_content, self.explore.categories, self.build_category)
 
         self.content.remove(self.spinner)
         self.content.append(page_content)
+
+    def on_explore_refreshed(self, explore):
+        self.explore = explore
+        self.set_categories(self.explore_content, explore.categories, self.build_category)
+
+    def build_category(self, category):
+        items = []
+
+        if isinstance(category.items[0], PageLink):
+            carousel, flow_box_box = self.get_link_carousel(category.title if category.title else "More")
+
+            flow_box = Gtk.FlowBox(homogeneous=True, height_request=100)
+            flow_box_box.append(flow_box)
+        else:
+            carousel, cards_box = self.get_carousel(category.title)
+
+        buttons_for_page = 0
+
+        for index, item in enumerate(category.items):
+            if isinstance(item, PageItem): # Featured
+                cards_box.append(item)
+            elif isinstance(item, PageLink): # Generes and moods
+                if buttons_for_page == 4:
+                    flow_box = Gtk.FlowBox(homogeneous=True, height_request=100)
+                    flow_box_box.append(flow_box)
+                    buttons_for_page = 0
+                button = self.get_page_link_card(item)
+                flow_box.append(button)
+                buttons_for_page += 1
+            elif isinstance(item, (Mix, Album, Artist, Playlist)): # Mixes and for you, albums, artists and playlists
+                cards_box.append(item)
+
+        return carousel
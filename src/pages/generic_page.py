@@ -44,15 +44,16 @@ class genericPage(Page):
 
     """It is not used much, possibly not needed anymore"""
 
+    def _fetch_page(self):
+        self.generic_content = self.item.get()
+
     def _load_page(self):
         builder = Gtk.Builder.new_from_resource("/io/github/nokse22/high-tide/ui/pages_ui/home_page_template.ui")
 
         page_content = builder.get_object("_main")
         generic_page_content = builder.get_object("_content")
 
-        generic_content = self.item.get()
-
-        for index, category in enumerate(generic_content.categories):
+        for index, category in enumerate(self.generic_content.categories):
             items = []
 
             carousel, cards_box = self.get_carousel(category.title)
@@ -64,24 +65,12 @@ class genericPage(Page):
 
             for item in category.items:
                 if isinstance(item, PageItem): # Featured
-                    button = self.get_page_item_card(item)
-                    cards_box.append(button)
+                    cards_box.append(item)
                 elif isinstance(item, PageLink): # Generes and moods
                     items.append("\t" + item.title)
-                    button = self.get_page_link_card(item)
-                    cards_box.append(button)
-                elif isinstance(item, Mix): # Mixes and for you
-                    button = self.get_mix_card(item)
-                    cards_box.append(button)
-                elif isinstance(item, Album):
-                    album_card = self.get_album_card(item)
-                    cards_box.append(album_card)
-                elif isinstance(item, Artist):
-                    button = self.get_artist_card(item)
-                    cards_box.append(button)
-                elif isinstance(item, Playlist):
-                    button = self.get_playlist_card(item)
-                    cards_box.append(button)
+                    cards_box.append(item)
+                elif isinstance(item, (Mix, Album, Artist, Playlist)): # Mixes and for you, albums, artists and playlists
+                    cards_box.append(item)
 
         self.content.remove(self.spinner)
         self.content.append(page_content)
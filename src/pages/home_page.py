@@ -33,16 +33,27 @@ from tidalapi.playlist import Playlist
 from tidalapi.user import Favorites
 
 from ..lib import utils
+from .. import startup_profiler
 
 import threading
-import requests
 import random
 
 from .page import Page
 
 class homePage(Page):
+    """It is used to display the home page, its sections are built only when
+    the scrolled window gets close to them"""
+
     __gtype_name__ = 'homePage'
 
+    # Sections built right away, before the page size is known
+    INITIAL_SECTIONS = 2
+
+    def _fetch_page(self):
+        # The cached home is shown right away, if it's old it's refreshed in the background
+        self.home = self.window.metadata_cache.get_stale_while_revalidate("home", self.window.session.user.id,
+                self.window.session.home, self.on_home_refreshed, self.cancellable)
+
     def _load_page(self):
         self.set_tag("home")
 
@@ -52,40 +63,68 @@ class homePage(Page):
         page_content = builder.get_object("_main")
         home_content = builder.get_object("_content")
 
-        home = self.window.session.home()
-
-        for index, category in enumerate(home.categories):
-            if index > 8:
-                break
-            items = []
-            if isinstance(category.items[0], PageItem) or isinstance(category.items[0], PageLink):
-                continue
-
-            carousel, cards_box = self.get_carousel(category.title)
-
-            if not isinstance(category.items[0], Track):
-                home_content.append(carousel)
-            else:
-                continue
-
-            for item in category.items:
-                if isinstance(item, PageItem): # Featured
-                    items.append("\t" + item.short_header)
-                    items.append("\t" + item.short_sub_header[0:50])
-                    button = self.get_page_item_card(item)
-                    # cards_box.append(button)
-                elif isinstance(item, Mix): # Mixes and for you
-                    button = self.get_mix_card(item)
-                    cards_box.append(button)
-                elif isinstance(item, Album):
-                    album_card = self.get_album_card(item)
-                    cards_box.append(album_card)
-                elif isinstance(item, Artist):
-                    button = self.get_artist_card(item)
-                    cards_box.append(button)
-                elif isinstance(item, Playlist):
-                    button = self.get_playlist_card(item)
-                    cards_box.append(button)
+        self.home_content = home_content
+        self.set_categories(home_content, self.home.categories, self.build_category)
+        for index in range(self.INITIAL_SECTIONS):
+            self.build_next_section()
+
+        adjustment = builder.get_object("_scrolled_window").get_vadjustment()
+        adjustment.connect("value-changed", self.on_adjustment_changed)
+        adjustment.connect("changed", self.on_adjustment_changed)
 
         self.content.remove(self.spinner)
         self.content.append(page_content)
+
+        startup_profiler.mark("home loaded")
+        self.add_tick_callback(self._on_first_frame)
+
+    def _on_first_frame(self, widget, frame_clock):
+        startup_profiler.mark("home rendered")
+        startup_profiler.dump()
+        return GLib.SOURCE_REMOVE
+
+    def on_home_refreshed(self, home):
+        self.home = home
+        self.set_categories(self.home_content, home.categories, self.build_category)
+        for index in range(self.INITIAL_SECTIONS):
+            self.build_next_section()
+
+    def on_adjustment_changed(self, adjustment):
+        # The sections not built yet are empty, so the content ends at the last built one,
+        # the next is built when there is less than a screen of content left below
+        remaining = adjustment.get_upper() - adjustment.get_value() - adjustment.get_page_size()
+        if adjustment.get_page_size() and remaining < adjustment.get_page_size():
+            self.build_next_section()
+
+    def build_next_section(self):
+        for signature, section in self.category_widgets:
+            if section.get_child() is None:
+                section.set_child(self.build_section(section.category))
+                return
+
+    def build_category(self, category):
+        if isinstance(category.items[0], PageItem) or isinstance(category.items[0], PageLink):
+            return None
+
+        if isinstance(category.items[0], Track):
+            return None
+
+        # An empty section that takes no space until it's built
+        section = Adw.Bin()
+        section.category = category
+        return section
+
+    def build_section(self, category):
+        items = []
+
+        carousel, cards_box = self.get_carousel(category.title)
+
+        for item in category.items:
+            if isinstance(item, PageItem): # Featured
+                items.append("\t" + item.short_header)
+                items.append("\t" + item.short_sub_header[0:50])
+                # cards_box.append(item)
+            elif isinstance(item, (Mix, Album, Artist, Playlist)): # Mixes and for you, albums, artists and playlists
+                cards_box.append(item)
+
+        return carousel
@@ -32,8 +32,8 @@ from tidalapi.media import Track
 from tidalapi.playlist import Playlist
 
 from ..lib import utils
+from ..lib import PaginatedList
 
-import threading
 import requests
 import random
 
@@ -42,34 +42,53 @@ from .page import Page
 class mixPage(Page):
     __gtype_name__ = 'mixPage'
 
+    is_cacheable = True
+
+    def __init__(self, _window, _item, _name):
+        super().__init__(_window, _item, _name)
+
+        self.tracks = []
+
+    def _fetch_page(self):
+        self.tracks = self.window.metadata_cache.get("mix-tracks", self.item.id, self.item.items)
+
+    def get_content_signature(self):
+        return tuple(track.id for track in self.tracks)
+
+    def _check_freshness(self):
+        tracks = self.window.metadata_cache.get("mix-tracks", self.item.id, self.item.items)
+        return tuple(track.id for track in tracks)
+
     def _load_page(self):
         builder = Gtk.Builder.new_from_resource("/io/github/nokse22/high-tide/ui/pages_ui/tracks_list_template.ui")
 
         page_content = builder.get_object("_main")
-        tracks_list_box = builder.get_object("_list_box")
-        tracks_list_box.connect("row-activated", self.on_row_selected)
+        tracks_list_view = builder.get_object("_list_view")
+        tracks_list_view.connect("activate", self.on_row_selected)
+        tracks_store = self.setup_track_list_view(tracks_list_view, header=builder.get_object("_header"))
 
         builder.get_object("_title_label").set_label(self.item.title)
         builder.get_object("_first_subtitle_label").set_label(self.item.sub_title)
 
         builder.get_object("_play_button").connect("clicked", self.on_play_button_clicked)
         builder.get_object("_shuffle_button").connect("clicked", self.on_shuffle_button_clicked)
-        builder.get_object("_add_to_my_collection_button").connect("clicked", self.on_add_to_my_collection_button_clicked)
+        self.setup_download_button(builder.get_object("_download_button"))
+        self.setup_favourite_button(builder.get_object("_add_to_my_collection_button"))
 
         image = builder.get_object("_image")
-        th = threading.Thread(target=utils.add_image, args=(image, self.item))
-        th.deamon = True
-        th.start()
+        utils.add_image(image, self.item, self.cancellable, utils.HEADER_IMAGE_SIZE)
 
-        for index, track in enumerate(self.item.items()):
-            listing = self.get_track_listing(track)
-            listing.set_name(str(index))
-            tracks_list_box.append(listing)
+        # Mixes return all their items at once, the rows are still added a page at a time
+        tracks = self.tracks
+        def get_mix_items(limit, offset):
+            return tracks[offset:offset + limit]
+
+        self.tracks_list = self.new_paginated_list(get_mix_items, lambda tracks: self.append_tracks(tracks_store, tracks))
+        self.tracks_list.load_next_page()
+        self.tracks_list.watch_scrolled_window(builder.get_object("_scrolled_window"))
 
         self.content.remove(self.spinner)
         self.content.append(page_content)
 
-    def on_row_selected(self, list_box, row):
-        index = int(row.get_name())
-
+    def on_row_selected(self, list_view, index):
         self.window.player_object.play_this(self.item, index)
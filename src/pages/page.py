@@ -33,20 +33,25 @@ from tidalapi.playlist import Playlist
 from tidalapi.user import Favorites
 
 from ..lib import utils
+from ..lib import TrackItem
+from ..lib import PaginatedList
 
-import threading
 import requests
 import random
 import os
 
 from ..widgets.generic_track_widget import GenericTrackWidget
 from ..widgets.card_widget import CardWidget
+from ..widgets.lazy_carousel import LazyCarousel, CarouselBox
 
 class Page(Adw.NavigationPage):
     __gtype_name__ = 'Page'
 
     """It's the base class for all types of pages, it contains all the shared functions"""
 
+    # Pages that show an item can be kept in the window page cache once left and shown again
+    is_cacheable = False
+
     def __init__(self, _window, _item=None, _name=None):
         super().__init__()
 
@@ -63,38 +68,215 @@ class Page(Adw.NavigationPage):
 
         self.set_child(self.object)
 
+        # Cancels the tasks, the pagination and the images of the page once it's gone,
+        # every time the page is shown again it gets a new one
+        self.cancellable = Gio.Cancellable()
+
+        self.is_loaded = False
+        self.paginated_lists = []
+
+        self.favourite_button = None
+        self.favourites_handler_id = None
+
     def load(self):
 
-        """Called when the page is created, it just starts a thread running the actual function to load the page UI"""
+        """Called when the page is created, it runs _fetch_page on a worker thread
+        and then _load_page on the main thread to build the page UI"""
+
+        utils.task_runner.run(self._fetch_page, callback=self._on_page_fetched,
+                error_callback=self._on_page_failed, cancellable=self.cancellable)
+
+    def reload(self):
+
+        """Called when the page is taken from the page cache to be shown again. A cheap
+        freshness check runs in the background and the page is rebuilt only if its data changed"""
+
+        # A reset cancellable would deliver the tasks queued before the page was left
+        self.cancellable = Gio.Cancellable()
+
+        self._connect_favourites()
+
+        for paginated_list in self.paginated_lists:
+            paginated_list.resume(self.cancellable)
+
+        def on_checked(signature):
+            if signature is not None and signature != self.get_content_signature():
+                self._rebuild()
+
+        self.run_task(self._check_freshness, callback=on_checked)
+
+    def get_content_signature(self):
+
+        """Overwritten by the pages that can tell if their data changed, it identifies the data shown"""
+
+        return None
+
+    def _check_freshness(self):
+
+        """Runs on a worker thread when the page is reused, returns the signature of the current
+        data, usually from the metadata cache, or None to keep the page as it is"""
+
+        return None
+
+    @classmethod
+    def get_cache_key(cls, item):
+        return (cls.__name__, type(item).__name__, getattr(item, "id", item))
+
+    def _rebuild(self):
+        child = self.content.get_first_child()
+        while child:
+            self.content.remove(child)
+            child = self.content.get_first_child()
+
+        self.paginated_lists = []
+        self._disconnect_favourites()
+        self.favourite_button = None
+        self.content.append(self.spinner)
+        self.load()
+
+    def cancel(self):
+
+        """Stops everything the page is still loading, its callbacks are not called anymore"""
+
+        self.cancellable.cancel()
+        utils.image_loader.cancel(self.cancellable)
+
+        # Keeps the page from being referenced by the favourites index
+        self._disconnect_favourites()
+
+    def on_removed(self):
+
+        """Called by the window when the page is popped or replaced in the navigation stack"""
+
+        self.cancel()
+
+        if self.is_cacheable and self.is_loaded:
+            self.window.page_cache.put(self.get_cache_key(self.item), self)
+
+    def run_task(self, function, *args, callback=None, error_callback=None):
+
+        """Runs function(*args) on a worker thread, callback receives the result on the main
+        thread only if the page is still alive"""
+
+        utils.task_runner.run(function, *args, callback=callback, error_callback=error_callback,
+                cancellable=self.cancellable)
+
+    def _fetch_page(self):
+
+        """Overwritten by the pages that need data from the service, it runs
+        on a worker thread so it must not touch any widget"""
+
+        return
+
+    def _on_page_fetched(self, result):
+        self._load_page()
+        self.is_loaded = True
+
+    def _on_page_failed(self, error):
+        print(f"failed to load the page: {error}")
+
+        retry_button = Gtk.Button(label="Retry", halign=Gtk.Align.CENTER, css_classes=["pill", "suggested-action"])
+        status_page = Adw.StatusPage(icon_name="dialog-error-symbolic", title="Couldn't Load the Page",
+                description="Check the connection and try again", child=retry_button, vexpand=True)
+        retry_button.connect("clicked", self._on_retry_button_clicked, status_page)
+
+        self.content.remove(self.spinner)
+        self.content.append(status_page)
+
+    def _on_retry_button_clicked(self, btn, status_page):
+        self.content.remove(status_page)
+        self.content.append(self.spinner)
+        self.load()
+
+    def add_image(self, image, item, size=utils.CARD_IMAGE_SIZE):
+
+        """Loads the image of a widget of the page. The request is dropped if the page is left
+        before it's loaded, it's made again when the image is mapped in a later visit"""
 
-        th = threading.Thread(target=self._load_page)
-        th.deamon = True
-        th.start()
+        if not hasattr(image, "page_image"):
+            image.connect("map", self._on_image_mapped)
+        image.page_image = (item, size, self.cancellable)
+        utils.add_image(image, item, self.cancellable, size)
+
+    def _on_image_mapped(self, image):
+        item, size, cancellable = image.page_image
+        if cancellable is not self.cancellable and image.get_storage_type() == Gtk.ImageType.ICON_NAME:
+            self.add_image(image, item, size)
+
+    def append_tracks(self, tracks_store, tracks):
+
+        """Adds the rows of tracks at the end of a store made by setup_track_list_view"""
+
+        tracks_store.splice(tracks_store.get_n_items(), 0, [TrackItem(track) for track in tracks])
+
+    def new_paginated_list(self, fetch_function, on_items_loaded, page_size=50):
+
+        """Returns a PaginatedList that stops with the page and resumes when it's reused"""
+
+        paginated_list = PaginatedList(fetch_function, on_items_loaded, page_size, self.cancellable)
+        self.paginated_lists.append(paginated_list)
+        return paginated_list
 
     def _load_page(self):
 
-        """Overwritten by each different page"""
+        """Overwritten by each different page, it runs on the main thread"""
 
         return
 
     def get_album_card(self, item):
-        card = CardWidget(item, self.window)
+        card = CardWidget(item, self.window, self)
         return card
 
     def get_track_listing(self, track):
-        track_listing = GenericTrackWidget(track, self.window, False)
+        track_listing = GenericTrackWidget(track, self.window, False, self)
         return track_listing
 
+    def setup_track_list_view(self, list_view, is_album=False, header=None):
+
+        """Sets up a Gtk.ListView to display tracks, only the visible rows are created
+        and they are reused while scrolling. Returns the Gio.ListStore of TrackItem to fill.
+        The header widget is shown above the tracks and scrolls with them"""
+
+        factory = Gtk.SignalListItemFactory()
+        factory.connect("setup", self._on_track_row_setup, is_album)
+        factory.connect("bind", self._on_track_row_bind)
+
+        store = Gio.ListStore.new(TrackItem)
+        list_view.set_factory(factory)
+
+        if header is None:
+            list_view.set_model(Gtk.NoSelection.new(store))
+            return store
+
+        # All the tracks are a single section, its header is the page header
+        sections = Gio.ListStore.new(Gio.ListModel)
+        sections.append(store)
+
+        header_factory = Gtk.SignalListItemFactory()
+        header_factory.connect("setup", lambda factory, list_header: list_header.set_child(header))
+        header_factory.connect("teardown", lambda factory, list_header: list_header.set_child(None))
+
+        list_view.set_header_factory(header_factory)
+        list_view.set_model(Gtk.NoSelection.new(Gtk.FlattenListModel.new(sections)))
+
+        return store
+
+    def _on_track_row_setup(self, factory, list_item, is_album):
+        list_item.set_child(GenericTrackWidget(None, self.window, is_album, self))
+
+    def _on_track_row_bind(self, factory, list_item):
+        list_item.get_child().set_track(list_item.get_item().track)
+
     def get_mix_card(self, item):
-        card = CardWidget(item, self.window)
+        card = CardWidget(item, self.window, self)
         return card
 
     def get_album_track_listing(self, track):
-        track_listing = GenericTrackWidget(track, self.window, True)
+        track_listing = GenericTrackWidget(track, self.window, True, self)
         return track_listing
 
     def get_playlist_card(self, playlist):
-        card = CardWidget(playlist, self.window)
+        card = CardWidget(playlist, self.window, self)
         return card
 
     def on_mix_button_clicked(self, btn, mix):
@@ -102,9 +284,7 @@ class Page(Adw.NavigationPage):
 
         from .mix_page import mixPage
 
-        page = mixPage(self.window, mix, mix.title)
-        page.load()
-        self.window.navigation_view.push(page)
+        self.window.push_page(mixPage, mix, mix.title)
 
     def on_play_button_clicked(self, btn):
         self.window.player_object.play_this(self.item)
@@ -112,23 +292,66 @@ class Page(Adw.NavigationPage):
     def on_shuffle_button_clicked(self, btn):
         self.window.player_object.shuffle_this(self.item)
 
+    def setup_download_button(self, btn):
+
+        """Shows the download button of the page, it downloads all the tracks of the item"""
+
+        btn.set_visible(True)
+        btn.connect("clicked", self.on_download_button_clicked)
+
+    def on_download_button_clicked(self, btn):
+        self.window.get_download_manager().download_collection(self.item)
+
     def on_artist_button_clicked(self, btn, artist):
         print(artist)
         self.window.sidebar_list.select_row(None)
 
         from .artist_page import artistPage
 
-        page = artistPage(self.window, artist, artist.name)
-        page.load()
-        self.window.navigation_view.push(page)
+        self.window.push_page(artistPage, artist, artist.name)
+
+    def get_category_signature(self, category):
+        """Identifies a category of the home or explore page by its title and items"""
+
+        return (category.title, tuple((type(item).__name__, getattr(item, "id", None)) for item in category.items))
+
+    def set_categories(self, container, categories, build_category):
+
+        """Shows the categories in container in order. The widgets of the categories
+        that didn't change since the last call are kept, the others are built with
+        build_category(category), which can return None to skip a category"""
+
+        old_widgets = {}
+        for signature, widget in getattr(self, "category_widgets", []):
+            old_widgets.setdefault(signature, []).append(widget)
+
+        self.category_widgets = []
+        previous = None
+        for category in categories:
+            signature = self.get_category_signature(category)
+            if old_widgets.get(signature):
+                widget = old_widgets[signature].pop(0)
+                container.reorder_child_after(widget, previous)
+            else:
+                widget = build_category(category)
+                if widget is None:
+                    continue
+                container.insert_child_after(widget, previous)
+            self.category_widgets.append((signature, widget))
+            previous = widget
+
+        for widgets in old_widgets.values():
+            for widget in widgets:
+                container.remove(widget)
 
     def get_carousel(self, title):
 
         """Creates a carousel used to display multiple elements side by side
-        with navigation arrows"""
+        with navigation arrows. Items are added with append(item) to the returned
+        LazyCarousel, their cards are created when they are about to be shown"""
 
         cards_box = Gtk.Box()
-        box = Gtk.Box(orientation=1, margin_bottom=12, margin_start=12, margin_end=12, overflow=Gtk.Overflow.HIDDEN)
+        box = CarouselBox(orientation=1, margin_bottom=12, margin_start=12, margin_end=12, overflow=Gtk.Overflow.HIDDEN)
         title_box = Gtk.Box(margin_top=12, margin_bottom=6)
         title_box.append(Gtk.Label(label=title, xalign=0, css_classes=["title-3"], ellipsize=3))
         prev_button = Gtk.Button(icon_name="go-next-symbolic", margin_start=6, halign=Gtk.Align.END, css_classes=["circular"])
@@ -144,7 +367,7 @@ class Page(Adw.NavigationPage):
         prev_button.connect("clicked", self.carousel_go_prev, cards_box)
         next_button.connect("clicked", self.carousel_go_next, cards_box)
 
-        return box, cards_box
+        return box, LazyCarousel(cards_box, self.get_card, box)
 
     def get_link_carousel(self, title):
 
@@ -199,9 +422,7 @@ class Page(Adw.NavigationPage):
 
         from .playlist_page import playlistPage
 
-        page = playlistPage(self.window, playlist, playlist.name)
-        page.load()
-        self.window.navigation_view.push(page)
+        self.window.push_page(playlistPage, playlist, playlist.name)
 
     def on_album_button_clicked(self, btn, album):
         self.window.sidebar_list.select_row(None)
@@ -209,23 +430,27 @@ class Page(Adw.NavigationPage):
 
         from .album_page import albumPage
 
-        page = albumPage(self.window, album, album.name)
-        page.load()
-        self.window.navigation_view.push(page)
+        self.window.push_page(albumPage, album, album.name)
 
     def get_artist_page(self, artist):
         from .artist_page import artistPage
 
-        page = artistPage(self.window, artist, artist.name)
-        page.load()
-        self.window.navigation_view.push(page)
+        self.window.push_page(artistPage, artist, artist.name)
 
     def get_artist_card(self, item):
-        card = CardWidget(item, self.window)
+        card = CardWidget(item, self.window, self)
         return card
 
+    def get_card(self, item):
+
+        """Returns the card for any item that can be in a carousel"""
+
+        if isinstance(item, PageLink):
+            return self.get_page_link_card(item)
+        return CardWidget(item, self.window, self)
+
     def get_page_item_card(self, page_item):
-        card = CardWidget(page_item, self.window)
+        card = CardWidget(page_item, self.window, self)
         return card
 
     def get_page_link_card(self, page_link):
@@ -237,56 +462,34 @@ class Page(Adw.NavigationPage):
     def on_page_link_clicked(self, btn, page_link):
         from .generic_page import genericPage
 
-        page = genericPage(self.window, page_link, page_link.title)
-        page.load()
-        self.window.navigation_view.push(page)
-
-    def add_to_my_collection(self, btn, item):
-        print(item)
-        if isinstance(item, Track):
-            result = self.window.session.user.favorites.add_track(item.id)
-        elif isinstance(item, Mix):
-            return # still not supported
-            result = self.window.session.user.favorites.add_mix(item.id)
-        elif isinstance(item, Album):
-            result = self.window.session.user.favorites.add_album(item.id)
-        elif isinstance(item, Artist):
-            result = self.window.session.user.favorites.add_artist(item.id)
-        elif isinstance(item, Playlist):
-            result = self.window.session.user.favorites.add_playlist(item.id)
-        else:
-            result = False
+        self.window.push_page(genericPage, page_link, page_link.title)
 
-        if result:
-            print("item successfully added to my collection")
-            btn.set_icon_name("heart-filled-symbolic")
-        else:
-            print("failed to add item to my collection")
-
-    def remove_from_my_collection(self, btn, item):
-        if isinstance(item, Track):
-            result = self.window.session.user.favorites.remove_track(item.id)
-        elif isinstance(item, Mix):
-            return # still not supported
-            result = self.window.session.user.favorites.remove_mix(item.id)
-        elif isinstance(item, Album):
-            result = self.window.session.user.favorites.remove_album(item.id)
-            print("adding album")
-        elif isinstance(item, Artist):
-            result = self.window.session.user.favorites.remove_artist(item.id)
-        elif isinstance(item, Playlist):
-            result = self.window.session.user.favorites.remove_playlist(item.id)
-        else:
-            result = False
+    def setup_favourite_button(self, btn):
 
-        if result:
-            print("item successfully removed from my collection")
-            btn.set_icon_name("heart-outline-thick-symbolic")
+        """Connects the heart button of the page, its icon follows the favourites index"""
+
+        btn.connect("clicked", self.on_add_to_my_collection_button_clicked)
+        self.favourite_button = btn
+        self._connect_favourites()
+
+    def _connect_favourites(self):
+        if self.favourite_button and not self.favourites_handler_id:
+            self.favourites_handler_id = self.window.favourites.connect("changed", self._update_favourite_button)
+            self._update_favourite_button()
+
+    def _disconnect_favourites(self):
+        if self.favourites_handler_id:
+            self.window.favourites.disconnect(self.favourites_handler_id)
+            self.favourites_handler_id = None
+
+    def _update_favourite_button(self, *args):
+        if self.window.favourites.contains(self.item):
+            self.favourite_button.set_icon_name("heart-filled-symbolic")
+        else:
+            self.favourite_button.set_icon_name("heart-outline-thick-symbolic")
 
     def on_add_to_my_collection_button_clicked(self, btn):
-        if btn.get_icon_name() == "heart-outline-thick-symbolic":
-            th = threading.Thread(target=self.add_to_my_collection, args=(btn, self.item,))
+        if self.window.favourites.contains(self.item):
+            self.window.favourites.remove(self.item)
         else:
-            th = threading.Thread(target=self.remove_from_my_collection, args=(btn, self.item,))
-        th.deamon = True
-        th.start()
+            self.window.favourites.add(self.item)
@@ -32,9 +32,9 @@ from tidalapi.media import Track
 from tidalapi.playlist import Playlist
 
 from ..lib import utils
+from ..lib import PaginatedList
 
 
-import threading
 import requests
 import random
 
@@ -43,20 +43,47 @@ from .page import Page
 class playlistPage(Page):
     __gtype_name__ = 'playlistPage'
 
+    is_cacheable = True
+
     """It is used to display a playlist with author, number of tracks and duration"""
 
     # FIXME Fix the favourite hearth
     # FIXME After playing shuffle the next track is not found
 
+    def __init__(self, _window, _item, _name):
+        super().__init__(_window, _item, _name)
+
+        self.updated_item = None # The playlist requested by the freshness check if it was edited
+
+    def _fetch_page(self):
+        if self.updated_item:
+            self.item = self.updated_item
+            self.updated_item = None
+
+    def get_content_signature(self):
+        return (self.item.last_updated, self.item.num_tracks)
+
+    def _check_freshness(self):
+        # Only the playlist is requested, its tracks are loaded again only if it was edited
+        playlist = self.window.session.playlist(self.item.id)
+        signature = (playlist.last_updated, playlist.num_tracks)
+
+        if signature != self.get_content_signature():
+            self.window.metadata_cache.invalidate_playlist(playlist.id)
+            self.updated_item = playlist
+        return signature
+
     def _load_page(self):
         builder = Gtk.Builder.new_from_resource("/io/github/nokse22/high-tide/ui/pages_ui/tracks_list_template.ui")
 
         page_content = builder.get_object("_main")
-        tracks_list_box = builder.get_object("_list_box")
-        tracks_list_box.connect("row-activated", self.on_row_selected)
+        tracks_list_view = builder.get_object("_list_view")
+        tracks_list_view.connect("activate", self.on_row_selected)
+        tracks_store = self.setup_track_list_view(tracks_list_view, header=builder.get_object("_header"))
 
         builder.get_object("_play_button").connect("clicked", self.on_play_button_clicked)
         builder.get_object("_shuffle_button").connect("clicked", self.on_shuffle_button_clicked)
+        self.setup_download_button(builder.get_object("_download_button"))
 
         builder.get_object("_title_label").set_label(self.item.name)
         creator = self.item.creator
@@ -68,19 +95,26 @@ class playlistPage(Page):
         builder.get_object("_second_subtitle_label").set_label(f"{self.item.num_tracks} tracks ({utils.pretty_duration(self.item.duration)})")
 
         image = builder.get_object("_image")
-        th = threading.Thread(target=utils.add_image, args=(image, self.item))
-        th.deamon = True
-        th.start()
+        utils.add_image(image, self.item, self.cancellable, utils.HEADER_IMAGE_SIZE)
 
-        for index, track in enumerate(self.item.items()):
-            listing = self.get_track_listing(track)
-            listing.set_name(str(index))
-            tracks_list_box.append(listing)
+        def get_playlist_items(limit, offset):
+            return self.window.metadata_cache.get("playlist-tracks", f"{self.item.id}:{offset}:{limit}",
+                    lambda: self.item.items(limit, offset))
+
+        # Long playlists are loaded a page at a time while scrolling
+        self.tracks_list = self.new_paginated_list(get_playlist_items, lambda tracks: self.append_tracks(tracks_store, tracks), 100)
+        self.tracks_list.load_next_page()
+        self.tracks_list.watch_scrolled_window(builder.get_object("_scrolled_window"))
 
         self.content.remove(self.spinner)
         self.content.append(page_content)
 
-    def on_row_selected(self, list_box, row):
-        index = int(row.get_name())
-
-        self.window.player_object.play_this(self.item, index)
+    def on_row_selected(self, list_view, index):
+        # The rows are the items loaded so far, videos included, Playlist.tracks() would
+        # only return the first page and the clicked row could be a different track
+        items = self.tracks_list.items
+        if not isinstance(items[index], Track):
+            return
+        tracks = [item for item in items if isinstance(item, Track)]
+        track_index = sum(isinstance(item, Track) for item in items[:index])
+        self.window.player_object.play_this(self.item, track_index, tracks)
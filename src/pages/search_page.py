@@ -48,22 +48,101 @@ class searchPage(Page):
     # TODO Implement filters
     # TODO Custom search page with filters (no builder with search_filters.ui)
 
+    SEARCH_TYPES = [Artist, Album, Playlist, Track]
+    SEARCH_LIMIT = 10
+
+    def __init__(self, _window, _item, _name):
+        super().__init__(_window, _item, _name)
+
+        self.query = None
+        self.results_box = None
+        self.in_flight = {} # search cache key -> Gio.Cancellable of the running search
+
     def _load_page(self):
         builder = Gtk.Builder.new_from_resource("/io/github/nokse22/high-tide/ui/pages_ui/home_page_template.ui")
 
         page_content = builder.get_object("_main")
-        results_box = builder.get_object("_content")
+        self.results_box = builder.get_object("_content")
 
         filter_builder = Gtk.Builder.new_from_resource("/io/github/nokse22/high-tide/ui/search_filter.ui")
         filters_scrolled_window = filter_builder.get_object("filters_scrolled_window")
 
         page_content.prepend(filters_scrolled_window)
 
-        query = self.window.search_entry.get_text()
+        self.content.remove(self.spinner)
+        self.content.append(page_content)
+
+        self.search(self.query or self.item)
+
+    def search(self, query):
+
+        """Shows the results of query, it's called again on every change of the search entry.
+        Cached results are shown right away, otherwise the results of a cached shorter query are
+        filtered and shown as a preview while the search runs. Searches for queries that are not current anymore
+        are cancelled and the same search is never run twice at the same time"""
+
+        self.query = query
+        self.set_title(f"Search: {query}")
+
+        if self.results_box is None:
+            return # Searches when the page is loaded
+
+        cache = self.window.search_cache
+        key = cache.get_key(query, self.SEARCH_TYPES, self.SEARCH_LIMIT)
+
+        for other_key, cancellable in list(self.in_flight.items()):
+            if other_key != key:
+                cancellable.cancel()
+                del self.in_flight[other_key]
+
+        results = cache.get(key)
+        if results is not None:
+            self.show_results(results)
+            return
+
+        # A preview from a shorter query, replaced by the results of the search
+        preview = cache.refine(key)
+        if preview is not None:
+            self.show_results(preview)
 
-        results = self.window.session.search(query, [Artist, Album, Playlist, Track], 10)
+        if key in self.in_flight:
+            return # The same search is already running
 
-        print(query, results)
+        cancellable = Gio.Cancellable()
+        self.in_flight[key] = cancellable
+        utils.task_runner.run(self.window.session.search, query, self.SEARCH_TYPES, self.SEARCH_LIMIT,
+                callback=lambda results: self._on_search_done(key, results),
+                error_callback=lambda e: self._on_search_failed(key, e),
+                cancellable=cancellable)
+
+    def _on_search_done(self, key, results):
+        self.in_flight.pop(key, None)
+        self.window.search_cache.put(key, results)
+
+        if self.cancellable.is_cancelled():
+            return
+
+        if self.window.search_cache.get_key(self.query, self.SEARCH_TYPES, self.SEARCH_LIMIT) == key:
+            self.show_results(results)
+
+    def _on_search_failed(self, key, error):
+        self.in_flight.pop(key, None)
+        print(f"search failed: {error}")
+
+    def cancel(self):
+        super().cancel()
+
+        for cancellable in self.in_flight.values():
+            cancellable.cancel()
+        self.in_flight.clear()
+
+    def show_results(self, results):
+        child = self.results_box.get_first_child()
+        while child:
+            self.results_box.remove(child)
+            child = self.results_box.get_first_child()
+
+        results_box = self.results_box
 
         top_hit = results["top_hit"]
         # results_box.append(Gtk.Label(label=top_hit.name))
@@ -75,27 +154,18 @@ class searchPage(Page):
         if len(artists) > 0:
             results_box.append(carousel)
             for artist in artists:
-                artist_card = self.get_artist_card(artist)
-                cards_box.append(artist_card)
+                cards_box.append(artist)
 
         carousel, cards_box = self.get_carousel("Albums")
         albums = results["albums"]
         if len(albums) > 0:
             results_box.append(carousel)
             for album in albums:
-                album_card = self.get_album_card(album)
-                cards_box.append(album_card)
+                cards_box.append(album)
 
         carousel, cards_box = self.get_carousel("Playlists")
         playlists = results["playlists"]
         if len(playlists) > 0:
             results_box.append(carousel)
             for playlist in playlists:
-                playlist_card = self.get_playlist_card(playlist)
-                cards_box.append(playlist_card)
-
-        scrolled_window = Gtk.ScrolledWindow(vexpand=True, hscrollbar_policy=Gtk.PolicyType.NEVER)
-
-        self.content.remove(self.spinner)
-        self.content.append(page_content)
-
+                cards_box.append(playlist)
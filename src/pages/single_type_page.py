@@ -33,6 +33,7 @@ from tidalapi.playlist import Playlist
 from tidalapi.user import Favorites
 
 from ..lib import utils
+from ..lib import PaginatedList
 
 import threading
 import requests
@@ -43,84 +44,78 @@ from .page import Page
 class singleTypePage(Page):
     __gtype_name__ = 'singleTypePage'
 
-    """Used to display favorites albums/artists/mixes/playlists and tracks"""
+    is_cacheable = True
 
-    # TODO load only a fixed number of items at first then if the page is scrolled down load some more
+    """Used to display favorites albums/artists/playlists and tracks, favourite
+    mixes are not supported by tidalapi 0.7.3"""
+
+    def get_content_signature(self):
+        return self.favourite_ids
+
+    def _check_freshness(self):
+        # The favourites index is kept up to date, nothing has to be requested
+        return self._get_favourite_ids()
+
+    def _get_favourite_ids(self):
+        return frozenset(self.window.favourites.ids[self.item])
 
     def _load_page(self):
+        self.favourite_ids = self._get_favourite_ids()
+
         builder = Gtk.Builder.new_from_resource("/io/github/nokse22/high-tide/ui/pages_ui/home_page_template.ui")
 
         page_content = builder.get_object("_main")
         content = builder.get_object("_content")
+        scrolled_window = builder.get_object("_scrolled_window")
+
+        favourites = Favorites(self.window.session, self.window.session.user.id)
 
         if self.item == "track":
-            self.add_tracks(content)
-        elif self.item == "mix":
-            self.add_mixes(content)
+            scrolled_window = self.add_tracks(favourites)
+            page_content = scrolled_window
         elif self.item == "album":
-            self.add_albums(content)
+            self.add_cards(content, favourites.albums, self.get_album_card)
         elif self.item == "artist":
-            self.add_artists(content)
+            self.add_cards(content, favourites.artists, self.get_artist_card)
         elif self.item == "playlist":
-            self.add_playlists(content)
+            self.add_cards(content, favourites.playlists, self.get_playlist_card)
+
+        # Only the first page is loaded now, the others when scrolling down
+        self.favourites_list.load_next_page()
+        self.favourites_list.watch_scrolled_window(scrolled_window)
 
         self.content.remove(self.spinner)
         self.content.append(page_content)
 
-    def add_tracks(self, content):
-        tracks_list_box = Gtk.ListBox(css_classes=["boxed-list"], margin_bottom=12, margin_start=12, margin_end=12, margin_top=12)
-        content.append(tracks_list_box)
-
-        favourite_tracks = Favorites(self.window.session, self.window.session.user.id).tracks(50)
-        tracks_list_box.connect("row-activated", self.on_tracks_row_selected, favourite_tracks)
-
-        for index, track in enumerate(favourite_tracks):
-            listing = self.get_track_listing(track)
-            listing.set_name(str(index))
-            tracks_list_box.append(listing)
-
-    def add_mixes(self, content):
-        flow_box = Gtk.FlowBox(selection_mode=0)
-        content.append(flow_box)
-
-        favourites = Favorites(self.window.session, self.window.session.user.id).mix()
+    def add_tracks(self, favourites):
 
-        for index, mix in enumerate(favourites):
-            card = self.get_mix_card(mix)
-            flow_box.append(card)
+        """The tracks are shown in a Gtk.ListView that has to be the direct child of the scrolled window,
+        so it doesn't use the _content box of the template"""
 
-    def add_artists(self, content):
-        flow_box = Gtk.FlowBox(selection_mode=0)
-        content.append(flow_box)
+        tracks_list_view = Gtk.ListView(css_classes=["card"], margin_bottom=12, margin_start=12, margin_end=12, margin_top=12,
+                show_separators=True, single_click_activate=True)
+        tracks_store = self.setup_track_list_view(tracks_list_view)
+        tracks_list_view.connect("activate", self.on_tracks_row_selected)
 
-        favourites = Favorites(self.window.session, self.window.session.user.id).artists()
-
-        for index, artist in enumerate(favourites):
-            card = self.get_artist_card(artist)
-            flow_box.append(card)
-
-    def add_playlists(self, content):
-        flow_box = Gtk.FlowBox(selection_mode=0)
-        content.append(flow_box)
+        clamp = Adw.ClampScrollable(maximum_size=1000, tightening_threshold=700, child=tracks_list_view)
+        scrolled_window = Gtk.ScrolledWindow(vexpand=True, hexpand=True, hscrollbar_policy=Gtk.PolicyType.NEVER, child=clamp)
 
-        favourites = Favorites(self.window.session, self.window.session.user.id).playlists()
+        self.favourites_list = self.new_paginated_list(favourites.tracks, lambda tracks: self.append_tracks(tracks_store, tracks))
 
-        for index, playlist in enumerate(favourites):
-            card = self.get_playlist_card(playlist)
-            flow_box.append(card)
+        return scrolled_window
 
-    def add_albums(self, content):
+    def add_cards(self, content, fetch_function, get_card):
         flow_box = Gtk.FlowBox(selection_mode=0)
         content.append(flow_box)
 
-        favourites = Favorites(self.window.session, self.window.session.user.id).albums()
+        def on_items_loaded(items):
+            for item in items:
+                flow_box.append(get_card(item))
 
-        for index, album in enumerate(favourites):
-            card = self.get_album_card(album)
-            flow_box.append(card)
+        self.favourites_list = self.new_paginated_list(fetch_function, on_items_loaded)
 
-    def on_tracks_row_selected(self, list_box, row, favourite_tracks):
-        index = int(row.get_name())
+    def on_tracks_row_selected(self, list_view, index):
+        favourite_tracks = self.favourites_list.items
 
         self.window.player_object.current_mix_album_list = favourite_tracks
         track = favourite_tracks[index]
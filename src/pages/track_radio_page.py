@@ -33,7 +33,6 @@ from tidalapi.playlist import Playlist
 
 from ..lib import utils
 
-import threading
 import requests
 import random
 
@@ -42,6 +41,8 @@ from .page import Page
 class trackRadioPage(Page):
     __gtype_name__ = 'trackRadioPage'
 
+    is_cacheable = True
+
     """It is used to display a radio from a track"""
 
     # FIXME Fix the favourite hearth (Probably impossible because tidalapi doesn't store a radio as a mix, but maybe possible with some ID)
@@ -51,12 +52,19 @@ class trackRadioPage(Page):
 
         self.radio_tracks = []
 
+    def _fetch_page(self):
+        if isinstance(self.item, Track):
+            self.radio_tracks = self.item.get_track_radio()
+        else:
+            self.radio_tracks = self.item.get_radio()
+
     def _load_page(self):
         builder = Gtk.Builder.new_from_resource("/io/github/nokse22/high-tide/ui/pages_ui/tracks_list_template.ui")
 
         page_content = builder.get_object("_main")
-        tracks_list_box = builder.get_object("_list_box")
-        tracks_list_box.connect("row-activated", self.on_row_selected)
+        tracks_list_view = builder.get_object("_list_view")
+        tracks_list_view.connect("activate", self.on_row_selected)
+        tracks_store = self.setup_track_list_view(tracks_list_view, header=builder.get_object("_header"))
 
         builder.get_object("_title_label").set_label(f"Radio of {self.item.name}")
 
@@ -69,28 +77,16 @@ class trackRadioPage(Page):
 
         image = builder.get_object("_image")
         if isinstance(self.item, Track):
-            th = threading.Thread(target=utils.add_image, args=(image, self.item.album))
+            utils.add_image(image, self.item.album, self.cancellable, utils.HEADER_IMAGE_SIZE)
         else:
-            th = threading.Thread(target=utils.add_image, args=(image, self.item))
-        th.deamon = True
-        th.start()
+            utils.add_image(image, self.item, self.cancellable, utils.HEADER_IMAGE_SIZE)
 
-        if isinstance(self.item, Track):
-            self.radio_tracks = self.item.get_track_radio()
-        else:
-            self.radio_tracks = self.item.get_radio()
-
-        for index, track in enumerate(self.radio_tracks):
-            listing = self.get_track_listing(track)
-            listing.set_name(str(index))
-            tracks_list_box.append(listing)
+        self.append_tracks(tracks_store, self.radio_tracks)
 
         self.content.remove(self.spinner)
         self.content.append(page_content)
 
-    def on_row_selected(self, list_box, row):
-        index = int(row.get_name())
-
+    def on_row_selected(self, list_view, index):
         self.window.player_object.play_this(self.radio_tracks, index)
 
     def on_play_button_clicked(self, btn):
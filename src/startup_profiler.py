@@ -0,0 +1,55 @@
+# startup_profiler.py
+#
+# Copyright 2023 Nokse
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Records when each step of the startup happens, with HIGH_TIDE_PROFILE_STARTUP
+set the times are printed once the home page is shown"""
+
+import os
+import sys
+import time
+
+ENV_VAR = "HIGH_TIDE_PROFILE_STARTUP"
+
+_start_time = time.perf_counter()
+_marks = [] # (step name, seconds since this module was imported)
+_dumped = False
+
+def mark(name):
+    """Records the time of a startup step, only the first time it happens"""
+
+    if _dumped or any(step == name for step, seconds in _marks):
+        return
+    _marks.append((name, time.perf_counter() - _start_time))
+
+def dump():
+    """Prints the recorded steps if the environment variable is set, it only
+    works once so that it can be called at every place the startup can end"""
+
+    global _dumped
+    if _dumped:
+        return
+    _dumped = True
+
+    if not os.environ.get(ENV_VAR):
+        return
+
+    previous = 0
+    for name, seconds in _marks:
+        print(f"startup: {name:<20} {seconds * 1000:8.1f} ms (+{(seconds - previous) * 1000:.1f} ms)", file=sys.stderr)
+        previous = seconds
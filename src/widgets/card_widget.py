@@ -23,7 +23,6 @@ from gi.repository import GLib
 from gi.repository import Gio
 
 import tidalapi
-import threading
 
 from ..lib import utils
 
@@ -49,11 +48,12 @@ class CardWidget(Gtk.Box):
     track_artist_label = Gtk.Template.Child()
     track_artist_button = Gtk.Template.Child()
 
-    def __init__(self, _item, _win):
+    def __init__(self, _item, _win, _page=None):
         super().__init__()
 
         self.item = _item
         self.win = _win
+        self.page = _page
 
         if isinstance(_item, Mix):
             self.make_mix_card()
@@ -66,24 +66,22 @@ class CardWidget(Gtk.Box):
         elif isinstance(_item, PageItem):
             self.make_page_item_card()
 
+        # Every kind of card shows the image of its item
+        if self.page:
+            self.page.add_image(self.image, self.item)
+        else:
+            utils.add_image(self.image, self.item)
+
     def make_mix_card(self):
         self.title_label.set_text(self.item.title)
         self.detail_label.set_text(self.item.sub_title)
         self.track_artist_label.set_visible(False)
 
-        th = threading.Thread(target=utils.add_image, args=(self.image, self.item))
-        th.deamon = True
-        th.start()
-
     def make_album_card(self):
         self.title_label.set_text(self.item.name)
         self.track_artist_label.set_text(self.item.artist.name)
         self.detail_label.set_visible(False)
 
-        th = threading.Thread(target=utils.add_image, args=(self.image, self.item))
-        th.deamon = True
-        th.start()
-
     def make_playlist_card(self):
         self.title_label.set_text(self.item.name)
         self.track_artist_label.set_visible(False)
@@ -95,57 +93,35 @@ class CardWidget(Gtk.Box):
             creator = "TIDAL"
         self.detail_label.set_text(f"by {creator}")
 
-        th = threading.Thread(target=utils.add_image, args=(self.image, self.item))
-        th.deamon = True
-        th.start()
-
     def make_artist_card(self):
         self.title_label.set_text(self.item.name)
         self.detail_label.set_text("Artist")
         self.track_artist_label.set_visible(False)
 
-        th = threading.Thread(target=utils.add_image, args=(self.image, self.item))
-        th.deamon = True
-        th.start()
-
     def make_page_item_card(self):
         self.title_label.set_text(self.item.short_header)
         self.detail_label.set_text(self.item.short_sub_header)
         self.track_artist_label.set_visible(False)
 
-        th = threading.Thread(target=utils.add_image, args=(self.image, self.item))
-        th.deamon = True
-        th.start()
-
     @Gtk.Template.Callback("on_artist_button_clicked")
     def _on_artist_button_clicked(self, *args):
         from ..pages.artist_page import artistPage
-        page = artistPage(self.win, self.item.artist, f"{self.item.artist.name}")
-        page.load()
-        self.win.navigation_view.push(page)
+        self.win.push_page(artistPage, self.item.artist, f"{self.item.artist.name}")
 
     @Gtk.Template.Callback("on_image_button_clicked")
     def _on_image_button_clicked(self, *args):
         if isinstance(self.item, Mix):
             from ..pages.mix_page import mixPage
-            page = mixPage(self.win, self.item, f"{self.item.title}")
-            page.load()
-            self.win.navigation_view.push(page)
+            self.win.push_page(mixPage, self.item, f"{self.item.title}")
 
         elif isinstance(self.item, Album):
             from ..pages.album_page import albumPage
-            page = albumPage(self.win, self.item, f"{self.item.name}")
-            page.load()
-            self.win.navigation_view.push(page)
+            self.win.push_page(albumPage, self.item, f"{self.item.name}")
 
         elif isinstance(self.item, Playlist):
             from ..pages.playlist_page import playlistPage
-            page = playlistPage(self.win, self.item, f"{self.item.name}")
-            page.load()
-            self.win.navigation_view.push(page)
+            self.win.push_page(playlistPage, self.item, f"{self.item.name}")
 
         elif isinstance(self.item, Artist):
             from ..pages.artist_page import artistPage
-            page = artistPage(self.win, self.item, f"{self.item.name}")
-            page.load()
-            self.win.navigation_view.push(page)
+            self.win.push_page(artistPage, self.item, f"{self.item.name}")
@@ -24,17 +24,18 @@ from gi.repository import GLib
 from gi.repository import Gio
 
 import tidalapi
-import threading
 
 from ..lib import utils
 
 from tidalapi.user import Favorites
+from tidalapi.playlist import UserPlaylist
 
 @Gtk.Template(resource_path='/io/github/nokse22/high-tide/ui/widgets/generic_track_widget.ui')
-class GenericTrackWidget(Gtk.ListBoxRow):
+class GenericTrackWidget(Gtk.Box):
     __gtype_name__ = 'GenericTrackWidget'
 
-    """It is used to display a single track"""
+    """It is used to display a single track, the same widget can be reused
+    for another track with set_track(), like the rows of a Gtk.ListView"""
 
     image = Gtk.Template.Child()
     track_album_label = Gtk.Template.Child()
@@ -46,7 +47,7 @@ class GenericTrackWidget(Gtk.ListBoxRow):
     _grid = Gtk.Template.Child()
     explicit_label = Gtk.Template.Child()
 
-    def __init__(self, _track, _win, is_album):
+    def __init__(self, _track, _win, is_album, _page=None):
         super().__init__()
 
         if is_album:
@@ -54,16 +55,10 @@ class GenericTrackWidget(Gtk.ListBoxRow):
             self.image.set_visible(False)
             self.track_title_label.set_margin_start(12)
 
-        self.track = _track
+        self.track = None
         self.win = _win
-
-        self.track_album_label.set_label(self.track.album.name)
-        self.track_title_label.set_label(self.track.name)
-        self.artist_label.set_label(self.track.artist.name)
-
-        self.explicit_label.set_visible(self.track.explicit)
-
-        self.track_duration_label.set_label(utils.pretty_duration(self.track.duration))
+        self.page = _page
+        self.is_album = is_album
 
         action_group = Gio.SimpleActionGroup()
         action_entries = [
@@ -104,15 +99,30 @@ class GenericTrackWidget(Gtk.ListBoxRow):
 
         self.insert_action_group("trackwidget", action_group)
 
-        th = threading.Thread(target=utils.add_image, args=(self.image, self.track.album))
-        th.deamon = True
-        th.start()
+        if _track:
+            self.set_track(_track)
+
+    def set_track(self, track):
+        self.track = track
+
+        self.track_album_label.set_label(self.track.album.name)
+        self.track_title_label.set_label(self.track.name)
+        self.artist_label.set_label(self.track.artist.name)
+
+        self.explicit_label.set_visible(self.track.explicit)
+
+        self.track_duration_label.set_label(utils.pretty_duration(self.track.duration))
+
+        if not self.is_album:
+            self.image.set_from_icon_name("emblem-music-symbolic")
+            if self.page:
+                self.page.add_image(self.image, self.track.album, utils.SMALL_IMAGE_SIZE)
+            else:
+                utils.add_image(self.image, self.track.album, size=utils.SMALL_IMAGE_SIZE)
 
     def _get_radio(self, *args):
         from ..pages.track_radio_page import trackRadioPage
-        page = trackRadioPage(self.win, self.track, f"{self.track.name} Radio")
-        page.load()
-        self.win.navigation_view.push(page)
+        self.win.push_page(trackRadioPage, self.track, f"{self.track.name} Radio")
 
     def _play_next(self, *args):
         self.win.player_object.add_next(self.track)
@@ -121,29 +131,30 @@ class GenericTrackWidget(Gtk.ListBoxRow):
         self.win.player_object.add_to_queue(self.track)
 
     def _add_to_my_collection(self, *args):
-        th = threading.Thread(target=self.th_add_to_my_collection, args=())
-        th.deamon = True
-        th.start()
-
-    def th_add_to_my_collection(self):
-        self.win.session.user.favorites.add_track(self.track.id)
+        self.win.favourites.add(self.track)
 
     def _add_to_playlist(self, action, parameter, playlist_index):
         playlist_id = parameter.get_string()
         selected_playlist = self.win.favourite_playlists[playlist_index]
 
-        print(f"Added to playlist: {selected_playlist.name}, ID: {playlist_id}")
+        if not isinstance(selected_playlist, UserPlaylist):
+            print(f"{selected_playlist.name} is not a playlist of the user")
+            return
+
+        def on_added(result):
+            # The cached tracks of the playlist are outdated now
+            self.win.metadata_cache.invalidate_playlist(selected_playlist.id)
+            print(f"Added to playlist: {selected_playlist.name}, ID: {playlist_id}")
+
+        utils.task_runner.run(selected_playlist.add, [self.track.id], callback=on_added,
+                error_callback=lambda e: print(f"failed to add to {selected_playlist.name}: {e}"))
 
     @Gtk.Template.Callback("on_artist_button_clicked")
     def _on_artist_button_clicked(self, *args):
         from ..pages.artist_page import artistPage
-        page = artistPage(self.win, self.track.artist, f"{self.track.artist.name}")
-        page.load()
-        self.win.navigation_view.push(page)
+        self.win.push_page(artistPage, self.track.artist, f"{self.track.artist.name}")
 
     @Gtk.Template.Callback("on_album_button_clicked")
     def _on_album_button_clicked(self, *args):
         from ..pages.album_page import albumPage
-        page = albumPage(self.win, self.track.album, f"{self.track.album.name}")
-        page.load()
-        self.win.navigation_view.push(page)
+        self.win.push_page(albumPage, self.track.album, f"{self.track.album.name}")
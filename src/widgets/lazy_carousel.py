@@ -0,0 +1,111 @@
+# lazy_carousel.py
+#
+# Copyright 2023 Nokse
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from gi.repository import Adw
+from gi.repository import Gtk
+from gi.repository import GLib
+from gi.repository import GObject
+
+class CarouselBox(Gtk.Box):
+    """The box that shows a carousel, it emits width-changed after its width changed
+    because that changes how many cards are visible and Adw.Carousel has no signal for it"""
+
+    __gtype_name__ = 'CarouselBox'
+
+    __gsignals__ = {
+        'width-changed': (GObject.SignalFlags.RUN_FIRST, None, ()),
+    }
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+        self.last_width = 0
+
+    def do_size_allocate(self, width, height, baseline):
+        Gtk.Box.do_size_allocate(self, width, height, baseline)
+
+        if width != self.last_width:
+            self.last_width = width
+            # Widgets can't be added while allocating, the cards are built after it
+            GLib.idle_add(self.emit, "width-changed")
+
+class LazyCarousel():
+    """Fills an Adw.Carousel with cards that are created only when they get close to the
+    visible ones.
+
+    Every item gets an empty Adw.Bin page right away, so the carousel has all its pages and
+    can be scrolled. The card, and with it the image request, is created inside the page
+    when the carousel position gets within preload pages of it. The visible cards are the
+    ones that fit in the width of box, a CarouselBox, they are built again when it changes"""
+
+    def __init__(self, carousel, build_card, box, preload=4):
+        self.carousel = carousel
+        self.build_card = build_card # item -> widget
+        self.box = box
+        self.preload = preload
+
+        self.items = []
+        self.pages = []
+        self.card_size = None # (width, height) of the first card, given to the empty pages
+
+        carousel.connect("notify::position", self._on_position_changed)
+        carousel.connect("map", self._on_position_changed)
+        box.connect("width-changed", self._on_position_changed)
+
+    def append(self, item):
+        page = Adw.Bin()
+        if self.card_size:
+            page.set_size_request(*self.card_size)
+
+        self.items.append(item)
+        self.pages.append(page)
+        self.carousel.append(page)
+
+        index = len(self.pages) - 1
+        if index < self._get_last_needed_index():
+            self._build(index)
+
+    def get_n_pages(self):
+        return len(self.pages)
+
+    def _get_last_needed_index(self):
+        visible = 6
+        width = self.box.get_width()
+        if self.card_size and width:
+            visible = width // max(self.card_size[0], 1) + 1
+        return int(self.carousel.get_position()) + visible + self.preload
+
+    def _on_position_changed(self, *args):
+        first = max(0, int(self.carousel.get_position()) - 1)
+        last = min(len(self.pages), self._get_last_needed_index())
+        for index in range(first, last):
+            if self.pages[index].get_child() is None:
+                self._build(index)
+
+    def _build(self, index):
+        card = self.build_card(self.items[index])
+        self.pages[index].set_child(card)
+
+        if self.card_size is None:
+            width = card.measure(Gtk.Orientation.HORIZONTAL, -1)[1]
+            height = card.measure(Gtk.Orientation.VERTICAL, width)[1]
+            self.card_size = (width, height)
+            for page in self.pages:
+                if page.get_child() is None:
+                    page.set_size_request(width, height)
@@ -37,31 +37,35 @@ from tidalapi.media import Track, Quality
 from tidalapi.playlist import Playlist
 
 from .lib import playerObject
+from .lib import PlayQueueModel
 from .lib import utils
 
 import os
 import sys
 
-from .login import LoginWindow
-from .new_playlist import NewPlaylistWindow
+from . import startup_profiler
 
-from .pages import homePage, singleTypePage, explorePage, artistPage, notLoggedInPage
-from .pages import searchPage, trackRadioPage, playlistPage, startUpPage
-
-import threading
-import requests
 import random
 
 from .lib import SecretStore
+from .lib import MetadataCache
+from .lib import PageCache
+from .lib import SearchCache
+from .lib import FavouritesIndex
+from .lib import OfflineLibrary
 
 from .widgets.generic_track_widget import GenericTrackWidget
 
+# The pages, the dialogs, the download manager and the stream cache are imported
+# where they are first used, so that they don't slow down the startup
+
 @Gtk.Template(resource_path='/io/github/nokse22/high-tide/window.ui')
 class TidalWindow(Adw.ApplicationWindow):
     __gtype_name__ = 'TidalWindow'
 
     # homepage_box = Gtk.Template.Child()
     split_view = Gtk.Template.Child()
+    toast_overlay = Gtk.Template.Child()
     progress_bar = Gtk.Template.Child()
     sidebar_list = Gtk.Template.Child()
     duration_label = Gtk.Template.Child()
@@ -93,6 +97,12 @@ class TidalWindow(Adw.ApplicationWindow):
         self.settings.bind("window-width", self, "default-width", Gio.SettingsBindFlags.DEFAULT)
         self.settings.bind("window-height", self, "default-height", Gio.SettingsBindFlags.DEFAULT)
 
+        utils.image_cache.set_max_size(self.settings.get_int("image-cache-size") * 1024 * 1024)
+        # It reads the whole cache folder, on a worker it doesn't delay the first frame.
+        # The images requested before it's done are downloaded again
+        utils.task_runner.run(utils.image_cache.load_index)
+        utils.texture_cache.set_max_size(self.settings.get_int("texture-cache-size") * 1024 * 1024)
+
         self.player_object = playerObject()
 
         self.volume_button.get_adjustment().set_value(self.settings.get_int("last-volume")/10)
@@ -101,15 +111,57 @@ class TidalWindow(Adw.ApplicationWindow):
 
         self.player_object.bind_property("shuffle_mode", self.shuffle_button, "active", GObject.BindingFlags.DEFAULT)
         self.player_object.connect("update-slider", self.update_slider)
+        self.player_object.connect("duration-changed", self.update_slider)
         self.player_object.connect("song-changed", self.on_song_changed)
-        self.player_object.connect("song-added-to-queue", self.update_queue)
         self.player_object.connect("play-changed", self.update_controls)
         self.artist_button.connect("clicked", self.on_toolbar_artist_button_clicked)
 
+        # search-changed is emitted after the entry search-delay, so typing doesn't start a search per key
+        self.search_entry.connect("search-changed", self.on_search_activated)
         self.search_entry.connect("activate", self.on_search_activated)
 
+        # Pages removed from the navigation stack are stopped and cached, popped is emitted
+        # for each page removed by pop_to_tag, replaced doesn't say which pages were removed
+        self.navigation_pages = []
+        self.navigation_view.connect("pushed", self.on_navigation_pushed)
+        self.navigation_view.connect("popped", self.on_navigation_popped)
+        self.navigation_view.connect("replaced", self.on_navigation_replaced)
+
+        self.queue_section_titles = {
+            PlayQueueModel.PLAYED: "Played songs",
+            PlayQueueModel.QUEUE: "Queue",
+            PlayQueueModel.UPCOMING: "Songs to play"
+        }
+        self.setup_queue_view()
+
+        self.page_cache = PageCache(self.settings.get_int("page-cache-size"), self.settings.get_int("page-cache-widgets"))
+
         self.session = tidalapi.Session()
 
+        self.metadata_cache = MetadataCache(self.session)
+        self.search_cache = SearchCache()
+
+        # Ids of the favourite items, every heart button checks them
+        self.favourites = FavouritesIndex(self.session)
+        self.favourites.connect("changed", self.update_in_my_collection_button)
+
+        self.offline_library = OfflineLibrary(self.settings.get_string("download-folder"))
+        utils.task_runner.run(self.offline_library.load)
+        self.player_object.offline_library = self.offline_library
+
+        if self.settings.get_boolean("stream-cache"):
+            from .lib import StreamCache
+
+            self.stream_cache = StreamCache(max_size=self.settings.get_int("stream-cache-size") * 1024 * 1024)
+            utils.task_runner.run(self.stream_cache.load_index)
+            self.player_object.stream_cache = self.stream_cache
+            self.player_object.read_ahead = self.settings.get_int("stream-read-ahead")
+        else:
+            self.stream_cache = None
+        self.download_manager = None # Created with the first download
+        self.downloads_finished = 0 # Since the last toast
+        self.downloads_failed = 0
+
         self.user = self.session.user
 
         self.select_quality(self.settings.get_int("quality"))
@@ -118,9 +170,9 @@ class TidalWindow(Adw.ApplicationWindow):
         self.player_object.current_song_index = 0
         self.previous_time = 0
         self.favourite_playlists = []
-        self.favourite_tracks = []
 
         self.secret_store = SecretStore(self.session)
+        startup_profiler.mark("secret store")
 
         # TO REMOVE UNSECURED TOKENS set in early development
         self.settings.set_string("token-type", "")
@@ -128,41 +180,47 @@ class TidalWindow(Adw.ApplicationWindow):
         self.settings.set_string("refresh-token", "")
         self.settings.set_string("expiry-time", "")
 
-        page = startUpPage(self, None, "Loading")
-        page.load()
-        self.navigation_view.push(page)
+        from .pages import startUpPage
+
+        self.push_page(startUpPage, None, "Loading")
 
-        th = threading.Thread(target=self.login, args=())
-        th.deamon = True
-        th.start()
+        utils.task_runner.run(self.login, callback=lambda result: self.on_logged_in(),
+                error_callback=self.on_login_failed)
+
+        startup_profiler.mark("window")
 
     def on_logged_in(self):
         print("on logged in")
-        self.favourite_tracks = self.session.user.favorites.tracks()
+        startup_profiler.mark("login")
+        self.favourites.load()
         # FIXME if it doesn't login fast enough it doesn't let the user login
 
         self.search_entry.set_sensitive(True)
 
+        from .pages import homePage
+
         page = homePage(self)
         page.load()
         self.navigation_view.replace([page])
 
-        th = threading.Thread(target=self._set_last_playing_song, args=())
-        th.deamon = True
-        th.start()
+        utils.task_runner.run(self._get_last_playing_song, callback=self._set_last_playing_song)
 
         self.add_favourite_playlists()
 
-    def on_login_failed(self):
-        print("login failed")
+    def on_login_failed(self, error):
+        print(f"login failed: {error}")
+        startup_profiler.dump()
+
+        from .pages import notLoggedInPage
 
         page = notLoggedInPage(self)
         page.load()
         self.navigation_view.replace([page])
 
     def add_favourite_playlists(self):
-        playlists = self.session.user.favorites.playlists()
+        utils.task_runner.run(self.session.user.favorites.playlists, callback=self._add_favourite_playlists)
 
+    def _add_favourite_playlists(self, playlists):
         child = self.sidebar_playlists.get_first_child()
         while child != None:
             self.sidebar_playlists.remove(child)
@@ -174,14 +232,19 @@ class TidalWindow(Adw.ApplicationWindow):
 
         self.favourite_playlists = playlists
 
-    def _set_last_playing_song(self):
+    def _get_last_playing_song(self):
         track_id = self.settings.get_int("last-playing-song-id")
         list_id = self.settings.get_string("last-playing-list-id")
 
         if track_id == '':
+            return None
+
+        return self.metadata_cache.get("track", track_id, lambda: self.session.track(track_id))
+
+    def _set_last_playing_song(self, track):
+        if track is None:
             return
 
-        track = self.session.track(track_id)
         self.player_object.play_track(track)
 
         # TODO Set last playing playlist/mix/album as current playing thing
@@ -196,18 +259,11 @@ class TidalWindow(Adw.ApplicationWindow):
         self.artist_label.set_label(track.artist.name)
         self.explicit_label.set_visible(track.explicit)
 
-        for favourite_track in self.favourite_tracks:
-            if favourite_track.isrc == track.isrc:
-                self.in_my_collection_button.set_icon_name("heart-filled-symbolic")
-                break
-        else:
-            self.in_my_collection_button.set_icon_name("heart-outline-thick-symbolic")
+        self.update_in_my_collection_button()
 
         self.settings.set_int("last-playing-song-id", track.id)
 
-        th = threading.Thread(target=utils.add_image, args=(self.playing_track_image, album))
-        th.deamon = True
-        th.start()
+        utils.add_image(self.playing_track_image, album, size=utils.PLAYER_IMAGE_SIZE)
 
         if self.player_object.is_playing:
             self.play_button.set_icon_name("media-playback-pause-symbolic")
@@ -215,72 +271,105 @@ class TidalWindow(Adw.ApplicationWindow):
             self.play_button.set_icon_name("media-playback-start-symbolic")
 
         # if self.right_sidebar_split_view.get_show_sidebar() or :
-        th = threading.Thread(target=self.add_lyrics_to_page, args=())
-        th.deamon = True
-        th.start()
+        self.add_lyrics_to_page()
 
         self.control_bar_artist = track.artist
         self.update_slider()
-        self.update_queue()
-
-    def update_queue(self, *args):
-        """Creates and populates the right sidebar queue view, if there is nothing in played_songs, queue or songs_to_play lists in player_object
-        it doesn't add that section"""
-
-        return
-
-        box = Gtk.Box(orientation=1)
-        played_songs_list_box = Gtk.ListBox(css_classes=["boxed-list"], margin_top=6,
-                margin_bottom=6, margin_start=6, margin_end=6)
-        queue_list_box = Gtk.ListBox(css_classes=["boxed-list"], margin_top=6,
-                margin_bottom=6, margin_start=6, margin_end=6)
-        songs_to_play_list_box = Gtk.ListBox(css_classes=["boxed-list"], margin_top=6,
-                margin_bottom=6, margin_start=6, margin_end=6)
-
-        if len(self.player_object.played_songs) > 0:
-            for index, track in enumerate(self.player_object.played_songs):
-                listing = GenericTrackWidget(track, self, False)
-                listing.set_name(str(index))
-                played_songs_list_box.append(listing)
-
-            box.append(Gtk.Label(label="Played songs", css_classes=["dim-label"], xalign=0, margin_start=12))
-            box.append(played_songs_list_box)
-
-        if len(self.player_object.queue) > 0:
-            for index, track in enumerate(self.player_object.queue):
-                listing = GenericTrackWidget(track, self, False)
-                listing.set_name(str(index))
-                queue_list_box.append(listing)
-
-            box.append(Gtk.Label(label="Queue", css_classes=["dim-label"], xalign=0, margin_start=12))
-            box.append(queue_list_box)
-
-        if len(self.player_object.tracks_to_play) > 0:
-            for index, track in enumerate(self.player_object.tracks_to_play):
-                listing = GenericTrackWidget(track, self, False)
-                listing.set_name(str(index))
-                songs_to_play_list_box.append(listing)
-
-            box.append(Gtk.Label(label="Songs to play", css_classes=["dim-label"], xalign=0, margin_start=12))
-            box.append(songs_to_play_list_box)
-
-        # print(self.queue_list.get_child().get_child())
-        # self.queue_list.remove(self.queue_list.get_child())
-        # print("REMOVED")
-        self.queue_list.set_child(box)
+
+    def setup_queue_view(self):
+        """Creates the right sidebar queue view, a single list view of the played songs,
+        the queue and the songs to play. The sections are list models that follow the player
+        queue, so only the rows that changed are updated"""
+
+        sections = Gio.ListStore.new(Gio.ListModel)
+        for section in [PlayQueueModel.PLAYED, PlayQueueModel.QUEUE, PlayQueueModel.UPCOMING]:
+            sections.append(PlayQueueModel(self.player_object.play_queue, section))
+
+        factory = Gtk.SignalListItemFactory()
+        factory.connect("setup", self._on_queue_row_setup)
+        factory.connect("bind", self._on_queue_row_bind)
+
+        header_factory = Gtk.SignalListItemFactory()
+        header_factory.connect("setup", self._on_queue_header_setup)
+        header_factory.connect("bind", self._on_queue_header_bind)
+
+        list_view = Gtk.ListView(
+            model=Gtk.NoSelection.new(Gtk.FlattenListModel.new(sections)),
+            factory=factory,
+            header_factory=header_factory,
+            margin_top=6, margin_bottom=6, margin_start=6, margin_end=6,
+            css_classes=["card"])
+        self.queue_list.set_child(list_view)
+
+    def _on_queue_row_setup(self, factory, list_item):
+        list_item.set_child(GenericTrackWidget(None, self, False))
+
+    def _on_queue_row_bind(self, factory, list_item):
+        list_item.get_child().set_track(list_item.get_item().track)
+
+    def _on_queue_header_setup(self, factory, list_header):
+        list_header.set_child(Gtk.Label(css_classes=["dim-label"], xalign=0, margin_start=6, margin_top=6))
+
+    def _on_queue_header_bind(self, factory, list_header):
+        list_header.get_child().set_label(self.queue_section_titles[list_header.get_item().section])
+
+    def push_page(self, page_class, item, name):
+        """Pushes the page showing item, if one was left recently it's taken from
+        the page cache instead of being built again"""
+
+        page = None
+        if page_class.is_cacheable:
+            page = self.page_cache.take(page_class.get_cache_key(item))
+
+        if page is None:
+            page = page_class(self, item, name)
+            page.load()
+        else:
+            page.reload()
+
+        self.navigation_view.push(page)
+
+    def _get_navigation_pages(self):
+        stack = self.navigation_view.get_navigation_stack()
+        return [stack.get_item(index) for index in range(stack.get_n_items())]
+
+    def on_navigation_pushed(self, navigation_view):
+        self.navigation_pages = self._get_navigation_pages()
+
+    def on_navigation_popped(self, navigation_view, page):
+        self.navigation_pages = self._get_navigation_pages()
+        page.on_removed()
+
+    def on_navigation_replaced(self, navigation_view):
+        old_pages = self.navigation_pages
+        self.navigation_pages = self._get_navigation_pages()
+        for page in old_pages:
+            if page not in self.navigation_pages:
+                page.on_removed()
 
     def on_toolbar_artist_button_clicked(self, btn):
         self.sidebar_list.select_row(None)
         artist = self.player_object.playing_track.artist
-        page = artistPage(self, artist, artist.name)
-        page.load()
-        self.navigation_view.push(page)
+
+        from .pages import artistPage
+
+        self.push_page(artistPage, artist, artist.name)
         print("clicked on artist")
 
     def on_search_activated(self, *args):
-        page = searchPage(self, None, "Search")
-        page.load()
-        self.navigation_view.push(page)
+        """Searches as the user types, the search page that is already shown is updated"""
+
+        query = self.search_entry.get_text()
+        if not query.strip():
+            return
+
+        from .pages import searchPage
+
+        page = self.navigation_view.get_visible_page()
+        if isinstance(page, searchPage):
+            page.search(query)
+        else:
+            self.push_page(searchPage, query, "Search")
 
     def update_controls(self, is_playing, *arg):
         if not is_playing:
@@ -293,30 +382,34 @@ class TidalWindow(Adw.ApplicationWindow):
     def new_login(self):
         """Opens a LoginWindow"""
 
+        from .login import LoginWindow
+
         login_window = LoginWindow(self, self.session)
         login_window.set_transient_for(self)
         login_window.set_modal(self)
         login_window.present()
 
     def login(self):
-        """Logs the user in, if it doesn't work it calls on_login_failed()"""
-        try:
-            result = self.session.load_oauth_session(
-                self.secret_store.token_dictionary["token-type"],
-                self.secret_store.token_dictionary["access-token"],
-                self.secret_store.token_dictionary["refresh-token"],
-                self.secret_store.token_dictionary["expiry-time"])
-        except Exception as e:
-            print(f"error! {e}")
-            GLib.idle_add(self.on_login_failed)
-        else:
-            self.on_logged_in()
+        """Logs the user in, it runs on a worker thread and raises an exception if it doesn't work"""
+
+        return self.session.load_oauth_session(
+            self.secret_store.token_dictionary["token-type"],
+            self.secret_store.token_dictionary["access-token"],
+            self.secret_store.token_dictionary["refresh-token"],
+            self.secret_store.token_dictionary["expiry-time"])
 
     def logout(self):
         self.secret_store.clear()
+        self.metadata_cache.clear()
+        self.page_cache.clear()
+        self.favourites.clear()
+        if self.download_manager:
+            self.download_manager.cancel_all()
 
         self.search_entry.set_sensitive(False)
 
+        from .pages import notLoggedInPage
+
         page = notLoggedInPage(self)
         page.load()
         self.navigation_view.replace([page])
@@ -367,28 +460,52 @@ class TidalWindow(Adw.ApplicationWindow):
     def on_lyrics_button_clicked_func(self, widget):
         self.right_sidebar_split_view.set_show_sidebar(not self.right_sidebar_split_view.get_show_sidebar())
 
-        th = threading.Thread(target=self.add_lyrics_to_page, args=())
-        th.deamon = True
-        th.start()
+        self.add_lyrics_to_page()
 
     def add_lyrics_to_page(self):
-        lyrics = self.player_object.playing_track.lyrics()
+        track = self.player_object.playing_track
+        utils.task_runner.run(track.lyrics, callback=self._on_lyrics_loaded,
+                error_callback=lambda e: print(f"no lyrics for {track.name}: {e}"))
+
+    def _on_lyrics_loaded(self, lyrics):
         self.lyrics_label.set_label(lyrics.text)
 
     def download_song(self):
-        """Added to check the streamed song quality, triggered with ctrl+d"""
+        """Downloads the playing song to the offline library, triggered with ctrl+d"""
 
-        song = self.player_object.playing_track
-        song_url = song.get_url()
-        try:
-            response = requests.get(song_url)
-        except:
+        track = self.player_object.playing_track
+        if track:
+            self.get_download_manager().download(track)
+
+    def get_download_manager(self):
+        """Returns the download manager, it's created the first time something is downloaded"""
+
+        if self.download_manager is None:
+            from .lib import DownloadManager
+
+            self.download_manager = DownloadManager(self.session, self.offline_library, self.settings.get_int("parallel-downloads"))
+            self.download_manager.connect("download-finished", self.on_download_done, True)
+            self.download_manager.connect("download-failed", self.on_download_done, False)
+        return self.download_manager
+
+    def on_download_done(self, download_manager, track_id, result, succeeded):
+        """Shows a toast once all the queued downloads are done"""
+
+        if succeeded:
+            self.downloads_finished += 1
+        else:
+            self.downloads_failed += 1
+
+        if download_manager.get_stats()["pending"]:
             return
-        if response.status_code == 200:
-            image_data = response.content
-            file_path = f"{song.id}.flac"
-            with open(file_path, "wb") as file:
-                file.write(image_data)
+
+        title = f"Downloaded {self.downloads_finished} tracks"
+        if self.downloads_failed:
+            title += f", {self.downloads_failed} failed"
+        self.toast_overlay.add_toast(Adw.Toast(title=title))
+
+        self.downloads_finished = 0
+        self.downloads_failed = 0
 
     def select_quality(self, pos):
         match pos:
@@ -407,24 +524,21 @@ class TidalWindow(Adw.ApplicationWindow):
 
     @Gtk.Template.Callback("on_in_my_collection_button_clicked")
     def on_in_my_collection_button_clicked(self, btn):
-        if self.in_my_collection_button.get_icon_name() == "heart-outline-thick-symbolic":
-            th = threading.Thread(target=self.add_track_to_my_collection, args=(self.player_object.playing_track.id,))
+        track = self.player_object.playing_track
+        if track is None:
+            return
+
+        if self.favourites.contains(track):
+            self.favourites.remove(track)
+        else:
+            self.favourites.add(track)
+
+    def update_in_my_collection_button(self, *args):
+        track = self.player_object.playing_track
+        if track and self.favourites.contains(track):
             self.in_my_collection_button.set_icon_name("heart-filled-symbolic")
         else:
-            th = threading.Thread(target=self.remove_track_from_my_collection, args=(self.player_object.playing_track.id,))
             self.in_my_collection_button.set_icon_name("heart-outline-thick-symbolic")
-        th.deamon = True
-        th.start()
-
-    def add_track_to_my_collection(self, track_id):
-        result = self.session.user.favorites.add_track(track_id)
-        if result:
-            print("successfully added to my collection")
-
-    def remove_track_from_my_collection(self, track_id):
-        result = self.session.user.favorites.remove_track(track_id)
-        if result:
-            print("successfully removed from my collection")
 
     @Gtk.Template.Callback("on_volume_changed")
     def on_volume_changed_func(self, widget, value):
@@ -434,6 +548,8 @@ class TidalWindow(Adw.ApplicationWindow):
 
     @Gtk.Template.Callback("on_new_playlist_button_clicked")
     def on_new_playlist_button_clicked_func(self, btn):
+        from .new_playlist import NewPlaylistWindow
+
         new_playlist_win = NewPlaylistWindow(self, self.session)
         new_playlist_win.set_transient_for(self)
         new_playlist_win.set_modal(self)
@@ -442,9 +558,10 @@ class TidalWindow(Adw.ApplicationWindow):
     @Gtk.Template.Callback("on_track_radio_button_clicked")
     def on_track_radio_button_clicked_func(self, widget):
         track = self.player_object.playing_track
-        page = trackRadioPage(self, track, f"{track.name} Radio")
-        page.load()
-        self.navigation_view.push(page)
+
+        from .pages import trackRadioPage
+
+        self.push_page(trackRadioPage, track, f"{track.name} Radio")
 
     @Gtk.Template.Callback("on_slider_seek")
     def on_slider_seek(self, *args):
@@ -475,40 +592,29 @@ class TidalWindow(Adw.ApplicationWindow):
 
         playlist = self.favourite_playlists[int(index)]
 
-        page = playlistPage(self, playlist, playlist.name)
-        page.load()
-        self.navigation_view.push(page)
+        from .pages import playlistPage
+
+        self.push_page(playlistPage, playlist, playlist.name)
 
     @Gtk.Template.Callback("on_sidebar_row_selected_clicked")
     def on_sidebar_row_selected_clicked_func(self, list_box, row):
         if row == None:
             return
+
+        from .pages import explorePage, singleTypePage
+
         if row.get_child().get_name() == "HOME":
             self.navigation_view.pop_to_tag("home")
         elif row.get_child().get_name() == "EXPLORE":
-            page = explorePage(self, None, "Explore")
-            page.load()
-            self.navigation_view.push(page)
+            self.push_page(explorePage, None, "Explore")
         elif row.get_child().get_name() == "F-TRACK":
-            page = singleTypePage(self, "track", "Favourite Tracks")
-            page.load()
-            self.navigation_view.push(page)
-        elif row.get_child().get_name() == "F-MIX": # Not supported by tidalapi
-            page = singleTypePage(self, "mix", "Favourite Mixes")
-            page.load()
-            self.navigation_view.push(page)
+            self.push_page(singleTypePage, "track", "Favourite Tracks")
         elif row.get_child().get_name() == "F-ARTIST":
-            page = singleTypePage(self, "artist", "Favourite Artists")
-            page.load()
-            self.navigation_view.push(page)
+            self.push_page(singleTypePage, "artist", "Favourite Artists")
         elif row.get_child().get_name() == "F-PLAYLIST":
-            page = singleTypePage(self, "playlist", "Favourite Playlists")
-            page.load()
-            self.navigation_view.push(page)
+            self.push_page(singleTypePage, "playlist", "Favourite Playlists")
         elif row.get_child().get_name() == "F-ALBUM":
-            page = singleTypePage(self, "album", "Favourite Albums")
-            page.load()
-            self.navigation_view.push(page)
+            self.push_page(singleTypePage, "album", "Favourite Albums")
 
     @Gtk.Template.Callback("show_sidebar")
     def show_sidebar_func(self, btn):